@@ -0,0 +1,173 @@
+"""
+Microbenchmark : coût par ROM de genFbNeo.game_layout_for_rom, avant / après
+le précalcul des chaînes physique → dinput → contrôleur (PANEL_CHAINS) et la
+résolution unique des deux boutons du layout 2-Button (resolve_panels).
+
+Les deux versions construisent le même modèle (layoutModel) avec la même
+résolution des couleurs : seule la construction des panels diffère. Vérifie
+qu'elles produisent le même XML pour toutes les ROMs de fbneo.yml, puis
+affiche le temps moyen par ROM (meilleur de N passages).
+
+Usage (depuis la racine du dépôt) : python bench/bench_fbneo_rom.py [-n RÉPÉTITIONS]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import genFbNeo  # noqa: E402
+from genFbNeo import (_COLORS, COIN_POS, DINPUT_TO_CONTROLLER, PANEL_IDS, PHYS_TO_DINPUT,  # noqa: E402
+                      START_POS, STATIC_POSITIONS)
+from layoutModel import Button, GameLayout, Layout, game_xml  # noqa: E402
+
+
+# ——— Implémentation de référence (avant précalcul), conservée pour comparaison ———
+
+def legacy_game_layout_for_rom(rom, color_cfg, controls):
+    rom_key = rom.lower()
+    mapping = controls.get(rom_key)
+    if not mapping:
+        return None
+
+    # Find INI section (case-insensitive, O(1) via the shared index)
+    cfg_section = color_cfg.section(rom_key)
+
+    # Inverse mapping for functions
+    ignore = {'players', 'coin', 'start', 'noplayer', 'service'}
+    inv = {val: str(key) for key, val in mapping.items()
+           if isinstance(val, str) and str(key).lower() not in ignore}
+
+    # Determine default panel from available colors
+    max_btn = 0
+    if cfg_section:
+        for opt in cfg_section:
+            if opt.startswith('P1_BUTTON'):
+                try:
+                    idx = int(opt.replace('P1_BUTTON', ''))
+                    max_btn = max(max_btn, idx)
+                except ValueError:
+                    pass
+    if max_btn <= 2:
+        default_panel = '2-Button'
+    elif max_btn <= 4:
+        default_panel = '4-Button'
+    elif max_btn <= 6:
+        default_panel = '6-Button'
+    else:
+        default_panel = '8-Button'
+
+    # Build default panel buttons_data
+    def_phys_list = PANEL_IDS[default_panel]
+    default_buttons = []
+    for phys in def_phys_list:
+        dinput = PHYS_TO_DINPUT[phys]
+        ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
+        func = inv.get(dinput, 'None')
+        default_buttons.append((phys, ctrl, dinput, func))
+    if default_panel == '2-Button':
+        # pick first two active
+        candidates = []
+        for panel in ['8-Button', '6-Button', '4-Button']:
+            for p in PANEL_IDS[panel]:
+                dinput = PHYS_TO_DINPUT[p]
+                ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
+                func = inv.get(dinput, 'None')
+                candidates.append((p, ctrl, dinput, func))
+        active = [b for b in candidates if b[3] != 'None']
+        if len(active) >= 2:
+            default_buttons = active[:2]
+        default_buttons.sort(key=lambda b: STATIC_POSITIONS[b[0]][0])
+    # Map functions to colors based on default panel order
+    function_to_color = {}
+    for idx, (_, _, _, func) in enumerate(default_buttons[:max_btn], start=1):
+        if func != 'None' and cfg_section:
+            color_val = _COLORS[cfg_section.get(f'P1_BUTTON{idx}', 'Gray')].name
+            function_to_color[func] = color_val
+
+    joy_color = _COLORS[cfg_section.get('P1_JOYSTICK', 'Gray')].name if cfg_section else 'Gray'
+    start_color = _COLORS[cfg_section.get('P1_START', 'White')].name if cfg_section else 'White'
+    coin_color = _COLORS[cfg_section.get('P1_COIN', 'White')].name if cfg_section else 'White'
+    layouts = []
+
+    for layout_type, phys_list in PANEL_IDS.items():
+        count = len(phys_list)
+        buttons = []
+
+        # Gather button data for this layout
+        buttons_data = []
+        for phys in phys_list:
+            dinput = PHYS_TO_DINPUT[phys]
+            ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
+            func = inv.get(dinput, 'None')
+            buttons_data.append((phys, ctrl, dinput, func))
+        # 2-Button special
+        if count == 2:
+            candidates = []
+            for panel in ['8-Button', '6-Button', '4-Button']:
+                for p in PANEL_IDS[panel]:
+                    dinput = PHYS_TO_DINPUT[p]
+                    ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
+                    func = inv.get(dinput, 'None')
+                    candidates.append((p, ctrl, dinput, func))
+            active = [b for b in candidates if b[3] != 'None']
+            if len(active) >= 2:
+                buttons_data = active[:2]
+            buttons_data.sort(key=lambda b: STATIC_POSITIONS[b[0]][0])
+
+        # Place buttons and apply colors by function
+        override_phys = (count == 2)
+        for idx, (phys, ctrl, dinput, func) in enumerate(buttons_data[:count], start=1):
+            phys_id = str(idx) if override_phys else phys
+            x, y = STATIC_POSITIONS[phys_id]
+            if func != 'None':
+                color = function_to_color.get(func, 'Gray')
+            else:
+                color = 'Black'
+            buttons.append(Button(str(idx), phys_id, ctrl, dinput, x, y, color, func))
+        # START and COIN
+        buttons.append(Button('START', str(count+1), 'START', mapping.get('Start', 'start'),
+                              START_POS[0], START_POS[1], start_color, 'Start'))
+        buttons.append(Button('COIN', str(count+2), 'SELECT', mapping.get('Coin', 'back'),
+                              COIN_POS[0], COIN_POS[1], coin_color, 'Coin'))
+        layouts.append(Layout(layout_type, count, joy_color, buttons))
+    return GameLayout('arcade', layouts, rom)
+
+
+def best_of(fn, roms, color_cfg, controls, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for rom in roms:
+            fn(rom, color_cfg, controls)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _xml(game):
+    return game_xml(game) if game is not None else None
+
+
+def main(repeat):
+    color_cfg = genFbNeo.load_color_config()
+    controls = genFbNeo.load_controls(verbose=False)
+    roms = list(controls)
+    diff = [rom for rom in roms
+            if _xml(legacy_game_layout_for_rom(rom, color_cfg, controls))
+            != _xml(genFbNeo.game_layout_for_rom(rom, color_cfg, controls))]
+    t_old = best_of(legacy_game_layout_for_rom, roms, color_cfg, controls, repeat)
+    t_new = best_of(genFbNeo.game_layout_for_rom, roms, color_cfg, controls, repeat)
+    print(f'{len(roms)} ROMs fbneo')
+    print(f'avant : {t_old / len(roms) * 1e6:7.1f} µs / ROM')
+    print(f'après : {t_new / len(roms) * 1e6:7.1f} µs / ROM   x{t_old / t_new:.2f}')
+    print(f'XML différents : {len(diff)}')
+    for rom in diff[:10]:
+        print(f'  - {rom}')
+    return 1 if diff else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    sys.exit(main(parser.parse_args().repeat))
@@ -0,0 +1,75 @@
+"""
+Benchmark : configparser contre le chargeur INI en une passe (iniIndex.parse_ini).
+
+Pour chaque jeu de fichiers utilisé par les générateurs, mesure le temps de
+chargement des deux chemins, à froid (cache par fichier de load_ini_file
+vidé à chaque mesure), et vérifie que les sections et options obtenues
+sont identiques.
+
+Usage (depuis la racine du dépôt) : python bench/bench_ini_loader.py [-n RÉPÉTITIONS]
+"""
+import sys
+import time
+import argparse
+import configparser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import iniIndex  # noqa: E402
+from iniIndex import IniIndex, parse_ini  # noqa: E402
+
+INI_SETS = [
+    (['ledspicer-arcade-colors.ini', 'ledblinky-arcade-colors.ini', 'goldo-systems-colors.ini'], True),
+    (['ledspicer-arcade-colors.ini', 'ledblinky-arcade-colors.ini'], True),
+    (['ledblinky-arcade-controls.ini'], False),
+    (['ledspicer-arcade-controls.ini'], True),
+    (['goldo-systems-colors.ini'], True),
+]
+
+
+def with_configparser(paths, strict):
+    cfg = configparser.ConfigParser(strict=strict)
+    cfg.optionxform = str
+    cfg.read(paths)
+    return IniIndex.from_configparser(cfg)
+
+
+def with_one_pass(paths, strict):
+    # Sans cela, chaque répétition relirait les sections du passage précédent
+    iniIndex._FILE_CACHE.clear()
+    return parse_ini(paths, strict)
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def same(a: IniIndex, b: IniIndex) -> bool:
+    return a.names() == b.names() and all(
+        list(a.section(n).items()) == list(b.section(n).items()) for n in a.names())
+
+
+def main(repeat):
+    status = 0
+    for paths, strict in INI_SETS:
+        old, t_old = best_of(lambda: with_configparser(paths, strict), repeat)
+        new, t_new = best_of(lambda: with_one_pass(paths, strict), repeat)
+        ok = same(old, new)
+        status |= not ok
+        print(f'{" + ".join(paths)}')
+        print(f'  {len(new)} sections, {len(new.conflicts)} valeur(s) écrasée(s) entre fichiers')
+        print(f'  configparser {t_old * 1000:8.1f} ms   une passe {t_new * 1000:8.1f} ms   '
+              f'x{t_old / t_new:.1f}   {"identique" if ok else "DIFFÉRENT"}')
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    sys.exit(main(parser.parse_args().repeat))
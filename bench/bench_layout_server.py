@@ -0,0 +1,134 @@
+"""
+Client de mesure de latence pour layoutServer.py.
+
+Lance le serveur dans un sous-processus (socket Unix temporaire, ou TCP local
+avec --tcp), envoie N requêtes sur une connexion persistante en piochant des
+ROMs / systèmes présents dans mame/, fbneo/ et systems/, puis affiche les
+percentiles d'aller-retour. Vérifie aussi qu'un échantillon de réponses
+correspond au XML sur disque, et compare au coût d'un `python launchGen.py`
+lancé à chaque requête (--spawn).
+
+Usage (depuis la racine du dépôt) : python bench/bench_layout_server.py [-n REQUÊTES] [--tcp PORT] [--spawn K]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from layoutModel import parse_xml  # noqa: E402
+from layoutServer import ARCADE_SOURCES, LayoutClient, parse_address  # noqa: E402
+
+PANELS = (2, 4, 6, 8)
+
+
+def sample_requests(count, seed=0):
+    rng = random.Random(seed)
+    names = {source: sorted(p[:-4] for p in os.listdir(ROOT / source) if p.endswith('.xml'))
+             for source in ('mame', 'fbneo', 'systems') if (ROOT / source).is_dir()}
+    requests = []
+    for _ in range(count):
+        source = rng.choice(sorted(names))
+        panel = rng.choice(PANELS)
+        name = rng.choice(names[source])
+        if source == 'systems':
+            requests.append(((source, name, panel), {'system': name, 'panel': panel}))
+        else:
+            requests.append(((source, name, panel), {'rom': name, 'panel': panel, 'source': source}))
+    return requests
+
+
+def wait_ready(address, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit('le serveur s\'est arrêté au démarrage')
+        try:
+            return LayoutClient(address)
+        except OSError:
+            time.sleep(0.05)
+    sys.exit('le serveur ne répond pas')
+
+
+def expected(source, name, panel):
+    with open(ROOT / source / f'{name}.xml', 'rb') as f:
+        game = parse_xml(f.read())
+    return next(lay.to_dict() for lay in game.layouts if lay.type == f'{panel}-Button')
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def spawn_cost(requests, count):
+    times = []
+    for (source, name, _), _req in requests[:count]:
+        system = source if source in ARCADE_SOURCES else name
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, 'launchGen.py', system, name, '-o', os.devnull],
+                       cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return sorted(times)
+
+
+def main(args):
+    tmp = tempfile.mkdtemp()
+    if args.tcp:
+        server_args, address = ['--tcp', args.tcp], parse_address(tcp=args.tcp)
+    else:
+        path = os.path.join(tmp, 'layouts.sock')
+        server_args, address = ['--socket', path], parse_address(path=path)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'layoutServer.py', 'serve', *server_args],
+                            cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        client = wait_ready(address, proc)
+        print(f'serveur prêt en {time.perf_counter() - t0:.2f} s')
+        requests = sample_requests(args.requests)
+        with client:
+            for _, req in requests[:100]:
+                client.raw(req)  # chauffe
+            times = []
+            for _, req in requests:
+                t = time.perf_counter()
+                client.raw(req)
+                times.append(time.perf_counter() - t)
+            wrong = []
+            for (source, name, panel), req in requests[:args.check]:
+                answer = client.request(req)
+                answer = {k: answer.get(k) for k in ('type', 'panelButtons', 'joystick', 'buttons')}
+                if answer != expected(source, name, panel):
+                    wrong.append(f'{source}/{name} {panel}')
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    times.sort()
+    print(f'{len(times)} requêtes sur {"TCP" if args.tcp else "socket Unix"} :')
+    for label, p in (('p50', 50), ('p90', 90), ('p99', 99)):
+        print(f'  {label} : {percentile(times, p) * 1e6:8.1f} µs')
+    print(f'  max : {times[-1] * 1e6:8.1f} µs')
+    print(f'  débit : {len(times) / sum(times):,.0f} requêtes/s')
+    if args.spawn:
+        spawned = spawn_cost(requests, args.spawn)
+        print(f'launchGen.py par requête ({len(spawned)}) : p50 {percentile(spawned, 50) * 1e3:.1f} ms'
+              f'   x{percentile(spawned, 50) / percentile(times, 50):,.0f}')
+    print(f'réponses différentes du XML : {len(wrong)} / {min(args.check, len(requests))}')
+    for item in wrong[:10]:
+        print(f'  - {item}')
+    return 1 if wrong else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--requests', type=int, default=20000)
+    parser.add_argument('--tcp', metavar='[HÔTE:]PORT', help='mesure en TCP local au lieu de la socket Unix')
+    parser.add_argument('--spawn', type=int, default=0, metavar='K',
+                        help='compare à K lancements de launchGen.py')
+    parser.add_argument('--check', type=int, default=500, help='réponses vérifiées contre le XML')
+    sys.exit(main(parser.parse_args()))
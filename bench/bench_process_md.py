@@ -0,0 +1,133 @@
+"""
+Benchmark : ancien parsing ligne à ligne de genRetroarch.process_md contre le
+parsing par tableaux tokenisés une seule fois (genRetroarch.parse_md).
+
+Parse les 157 docs libreto/*.md par les deux chemins, vérifie que les groupes
+et le XML rendu sont identiques, puis affiche les temps (meilleur de N).
+
+Usage (depuis la racine du dépôt) : python bench/bench_process_md.py [-n RÉPÉTITIONS]
+"""
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import genRetroarch  # noqa: E402
+
+
+# ——— Implémentation de référence (avant réécriture), conservée pour comparaison ———
+
+def legacy_extract_table(lines, idx):
+    rows = []
+    for l in lines[idx+1:]:
+        if not l.startswith('|'):
+            break
+        if set(l.strip()) <= set('|- '):
+            continue
+        rows.append(l.rstrip())
+    return rows
+
+def legacy_clean_group_name(raw):
+    s = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', raw)
+    s = re.sub(r'[\[\]\(\)]', '', s).strip()
+    return s or 'default'
+
+def legacy_extract_sysent(cell):
+    m = re.search(r'/([^/]+?)\.(?:png|jpg|svg)', cell)
+    if m:
+        name = m.group(1)
+        if '_' in name:
+            name = name.split('_',1)[1]
+        return name
+    return cell
+
+def legacy_fallback_scan(lines):
+    seen = set()
+    out = []
+    for l in lines:
+        for m in re.finditer(r'\.\./image/retropad/retro_([a-z0-9_]+)\.png', l):
+            k = m.group(1).lower()
+            if k in seen: continue
+            seen.add(k)
+            out.append((k, k.upper(), ''))
+    return out
+
+def legacy_parse_md(md_path):
+    lines = md_path.read_text(encoding='utf-8').splitlines()
+    groups = []
+    last_heading = 'default'
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('####'):
+            last_heading = legacy_clean_group_name(line.lstrip('#').strip())
+            i += 1
+            continue
+        if line.startswith('|'):
+            tbl = legacy_extract_table(lines, i)
+            if any('../image/retropad/' in r for r in tbl):
+                headers = [c.strip() for c in line.strip().strip('|').split('|')]
+                idx_desc, idx_rp, system_cols = genRetroarch.find_header_indices(headers)
+                if idx_rp is None and tbl:
+                    first = [c.strip() for c in tbl[0].strip().strip('|').split('|')]
+                    idx_rp = next((j for j,v in enumerate(first)
+                                   if '../image/retropad/' in v), None)
+                for sys_idx in system_cols:
+                    grp_name = legacy_clean_group_name(headers[sys_idx] or last_heading)
+                    mappings = []
+                    for row in tbl:
+                        cells = [c.strip() for c in row.strip().strip('|').split('|')]
+                        if idx_rp is None or idx_rp >= len(cells): continue
+                        mimg = re.search(r'/([^/]+?)\.(?:png|jpg|svg)', cells[idx_rp])
+                        if not mimg: continue
+                        key = mimg.group(1).replace('retro_','').lower()
+                        desc = (cells[idx_desc]
+                                if idx_desc is not None and idx_desc<len(cells) else '')
+                        raw_sys = cells[sys_idx] if sys_idx<len(cells) else ''
+                        sysent = legacy_extract_sysent(raw_sys)
+                        text = desc or sysent
+                        mappings.append((key, text, sysent))
+                    if mappings:
+                        groups.append({'name':grp_name, 'mappings':mappings})
+                i += len(tbl) + 1
+                continue
+        i += 1
+    if not groups:
+        fb = legacy_fallback_scan(lines)
+        if fb:
+            groups = [{'name':'default','mappings':fb}]
+    return groups
+
+
+def best_of(fn, mds, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = [fn(md) for md in mds]
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(repeat):
+    mds = sorted(Path('libreto').glob('*.md'))
+    old, t_old = best_of(legacy_parse_md, mds, repeat)
+    new, t_new = best_of(genRetroarch.parse_md, mds, repeat)
+    diff_groups = [md.name for md, a, b in zip(mds, old, new) if a != b]
+    diff_xml = [md.name for md, a, b in zip(mds, old, new)
+                if genRetroarch.render_core(md, a) != genRetroarch.render_core(md, b)]
+    print(f'{len(mds)} docs libretro')
+    print(f'ancien parsing  : {t_old * 1000:8.1f} ms')
+    print(f'nouveau parsing : {t_new * 1000:8.1f} ms   x{t_old / t_new:.1f}')
+    print(f'groupes différents : {len(diff_groups)}   XML différents : {len(diff_xml)}')
+    for name in (diff_groups + diff_xml)[:10]:
+        print(f'  - {name}')
+    return 1 if diff_groups or diff_xml else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    sys.exit(main(parser.parse_args().repeat))
@@ -0,0 +1,78 @@
+"""
+Benchmark : minidom (ET.tostring → parseString → toprettyxml) contre xmlWriter.
+
+Recharge chaque XML de mame/ et fbneo/, sérialise l'arbre par les deux chemins,
+vérifie que les octets sont identiques (entre eux et avec le fichier sur disque)
+puis affiche le temps total et le pic mémoire (tracemalloc) de chaque chemin.
+
+Usage (depuis la racine du dépôt) : python bench/bench_xml_writer.py [dossier ...]
+"""
+import sys
+import time
+import hashlib
+import tracemalloc
+from pathlib import Path
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from xmlWriter import pretty_xml  # noqa: E402
+
+
+def strip_indent(elem):
+    # Retire l'indentation relue depuis le fichier pour retrouver l'arbre généré
+    for node in elem.iter():
+        if node.text is not None and not node.text.strip() and len(node):
+            node.text = None
+        if node.tail is not None and not node.tail.strip():
+            node.tail = None
+    return elem
+
+
+def old_path(elem):
+    rough = ET.tostring(elem, 'utf-8')
+    return minidom.parseString(rough).toprettyxml(indent='  ', encoding='utf-8')
+
+
+def new_path(elem):
+    return pretty_xml(elem, indent='  ', encoding='utf-8')
+
+
+def measure(fn, trees):
+    # Temps sans traçage, puis pic mémoire par fichier (le plus gros retenu)
+    t0 = time.perf_counter()
+    digests = [hashlib.sha1(fn(tree)).digest() for tree in trees]
+    elapsed = time.perf_counter() - t0
+    peak = 0
+    tracemalloc.start()
+    for tree in trees:
+        tracemalloc.reset_peak()
+        fn(tree)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return digests, elapsed, peak
+
+
+def main(dirs):
+    files = [p for d in dirs for p in sorted(Path(d).glob('*.xml'))]
+    trees = [strip_indent(ET.parse(p).getroot()) for p in files]
+    print(f'{len(files)} fichiers XML ({", ".join(dirs)})')
+
+    old, t_old, m_old = measure(old_path, trees)
+    new, t_new, m_new = measure(new_path, trees)
+
+    mismatch = [p.name for p, a, b in zip(files, old, new) if a != b]
+    on_disk = [p.name for p, b in zip(files, new)
+               if hashlib.sha1(p.read_bytes()).digest() != b]
+    print(f'minidom   : {t_old:7.3f} s   pic/fichier {m_old / 1024:8.1f} Kio')
+    print(f'xmlWriter : {t_new:7.3f} s   pic/fichier {m_new / 1024:8.1f} Kio')
+    print(f'gain      : x{t_old / t_new:.1f} en temps, x{m_old / max(m_new, 1):.1f} en mémoire')
+    print(f'différences minidom/xmlWriter : {len(mismatch)}')
+    print(f'différences avec le disque    : {len(on_disk)}')
+    for name in (mismatch + on_disk)[:10]:
+        print(f'  - {name}')
+    return 1 if mismatch else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:] or ['mame', 'fbneo']))
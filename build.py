@@ -0,0 +1,310 @@
+"""
+Reconstruction complète des layouts en une seule commande.
+
+    python build.py [-j N] [--force] [--bundle] [--leds] [--db [FICHIER]] [--serial] [-v] [ÉTAPE ...]
+    python build.py --watch [--interval S] [ÉTAPE ...]
+
+Les quatre générateurs (mame, fbneo, retroarch, systems) sont importés une
+fois et chaque source (INI couleurs / contrôles, fbneo.yml) n'est chargée
+qu'une fois pour toutes les étapes qui l'utilisent. Les étapes forment un
+graphe de dépendances (retroarch avant systems, avec passage des cores en
+mémoire) ; les chaînes indépendantes tournent en parallèle dans des processus
+forkés qui héritent des sources déjà chargées. Sans fork (Windows) ou avec
+--serial, elles s'exécutent l'une après l'autre dans ce processus.
+
+Avec --watch, le processus reste actif : à chaque modification d'un INI,
+de fbneo.yml ou d'une doc libreto/*.md, seules les étapes concernées sont
+relancées et seuls les XML touchés sont réécrits.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+import multiprocessing
+
+from buildManifest import add_force_argument, file_stamps, watched_sources
+from layoutBundle import add_bundle_argument
+from layoutDb import add_db_argument
+from ledFrames import add_leds_argument
+from romPool import add_jobs_argument
+
+
+# ——— Chargement partagé des sources ———
+
+def load_mame():
+    import genMame
+    genMame.load_configurations()
+
+def load_fbneo():
+    import genFbNeo
+    genFbNeo.load_color_config()
+    genFbNeo.load_controls(verbose=False)
+
+def load_retroarch():
+    import genRetroarch  # noqa: F401  (les docs sont lues par document)
+
+def load_systems():
+    import genSystems
+    genSystems.load_system_colors(genSystems.SYSTEMS_INI)
+
+
+# ——— Étapes : chacune retourne son nombre d'échecs ———
+
+def run_mame(opts, ctx):
+    import genMame
+    failures = genMame.generate_all_xmls(opts.jobs, opts.force)
+    publish(opts, 'mame', genMame.OUTPUT_DIR)
+    return failures
+
+def run_fbneo(opts, ctx):
+    import genFbNeo
+    failures = genFbNeo.generate_all_xmls(opts.jobs, opts.force)
+    publish(opts, 'fbneo', genFbNeo.OUTPUT_DIR)
+    return failures
+
+def run_retroarch(opts, ctx):
+    import genRetroarch
+    failures, ctx['cores'] = genRetroarch.convert_docs(opts.jobs, opts.force)
+    return failures
+
+def run_systems(opts, ctx):
+    import genSystems
+    # Cores transmis par l'étape retroarch si elle a tourné dans la même chaîne
+    genSystems.main(opts.force, ctx.get('cores'))
+    publish(opts, 'systems', genSystems.OUTPUT_DIR)
+    return 0
+
+def publish(opts, source, output_dir):
+    """Formats de sortie optionnels : bundle indexé, trames LED et / ou base SQLite."""
+    if opts.bundle:
+        from layoutBundle import pack_dir
+        print(f'Bundle : {pack_dir(output_dir)}')
+    if opts.leds:
+        from ledFrames import pack_dir as pack_leds
+        print(f'LED : {pack_leds(output_dir)}')
+    if opts.db:
+        from layoutDb import update_db
+        print(update_db(source, output_dir, opts.db))
+
+
+# nom → (dépendances, chargement, exécution), dans un ordre topologique
+STAGES = {
+    'mame':      ((),            load_mame,      run_mame),
+    'fbneo':     ((),            load_fbneo,     run_fbneo),
+    'retroarch': ((),            load_retroarch, run_retroarch),
+    'systems':   (('retroarch',), load_systems,  run_systems),
+}
+
+
+def plan_lanes(names):
+    """Regroupe les étapes reliées par une dépendance en chaînes ordonnées."""
+    lane_of = {}
+    lanes = []
+    for name in STAGES:
+        if name not in names:
+            continue
+        deps = [lane_of[d] for d in STAGES[name][0] if d in lane_of]
+        lane = deps[0] if deps else []
+        for other in deps[1:]:
+            if other is not lane:
+                lane.extend(other)
+                other.clear()
+        lane.append(name)
+        for n in lane:
+            lane_of[n] = lane
+        if not deps:
+            lanes.append(lane)
+    return [lane for lane in lanes if lane]
+
+
+def run_lane(lane, opts):
+    """Exécute une chaîne d'étapes : [(étape, durée, échecs, erreur, sortie)]."""
+    ctx = {}
+    report = []
+    for name in lane:
+        out = io.StringIO()
+        t0 = time.perf_counter()
+        error = None
+        with contextlib.redirect_stdout(out):
+            try:
+                failures = STAGES[name][2](opts, ctx) or 0
+            except Exception as exc:
+                failures, error = 1, f'{type(exc).__name__}: {exc}'
+        report.append((name, time.perf_counter() - t0, failures, error, out.getvalue()))
+    return report
+
+
+def _lane_process(lane, opts, conn):
+    conn.send(run_lane(lane, opts))
+    conn.close()
+
+
+def run_concurrent(lanes, opts):
+    ctx = multiprocessing.get_context('fork')
+    running = []
+    for lane in lanes:
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_lane_process, args=(lane, opts, send))
+        proc.start()
+        send.close()
+        running.append((lane, proc, recv))
+    report = []
+    for lane, proc, recv in running:
+        try:
+            report.extend(recv.recv())
+        except EOFError:
+            report.extend((name, 0.0, 1, 'processus interrompu', '') for name in lane)
+        proc.join()
+    return report
+
+
+def print_outputs(report, verbose):
+    """Sortie des étapes (toutes avec -v, sinon celles en échec) ; retourne le total d'échecs."""
+    failed = 0
+    for name, elapsed, failures, error, output in report:
+        if verbose or failures:
+            print(f'——— {name} ———')
+            sys.stdout.write(output)
+            if error:
+                print(error)
+        failed += failures
+    return failed
+
+
+def build(names, opts):
+    t0 = time.perf_counter()
+    for name in names:
+        STAGES[name][1]()
+    load_time = time.perf_counter() - t0
+
+    lanes = plan_lanes(names)
+    concurrent = (len(lanes) > 1 and not opts.serial
+                  and 'fork' in multiprocessing.get_all_start_methods())
+    if concurrent:
+        report = run_concurrent(lanes, opts)
+    else:
+        report = [r for lane in lanes for r in run_lane(lane, opts)]
+    report.sort(key=lambda r: list(STAGES).index(r[0]))
+
+    failed = print_outputs(report, opts.verbose)
+    print(f'{"chargement":<11}{load_time:8.2f} s')
+    for name, elapsed, failures, error, output in report:
+        status = 'OK' if not failures else f'{failures} échec(s)'
+        print(f'{name:<11}{elapsed:8.2f} s   {status}')
+    mode = 'parallèle' if concurrent else 'série'
+    print(f'{"total":<11}{time.perf_counter() - t0:8.2f} s   ({len(lanes)} chaîne(s), {mode})')
+    return failed
+
+
+# ——— Mode --watch ———
+
+def _parsed(path):
+    """Dernier parsing en mémoire de `path` ({section|rom: ...}), pour le diff."""
+    import iniIndex, genFbNeo
+    if path.endswith('.ini'):
+        return iniIndex.cached_file_sections(path)
+    if path == genFbNeo.CONTROLS_YAML:
+        return genFbNeo.cached_controls()
+    return None
+
+
+def describe_change(path, before, after):
+    from iniIndex import changed_sections
+    if before is None or after is None:
+        return f'{path} : modifié'
+    keys = changed_sections(before, after)
+    what = 'section(s)' if path.endswith('.ini') else 'entrée(s)'
+    shown = ', '.join(keys[:8]) + (', …' if len(keys) > 8 else '')
+    return f'{path} : {len(keys)} {what} modifiée(s)' + (f' ({shown})' if keys else '')
+
+
+def affected_stages(changed, sources, names):
+    hit = {stage for path in changed for stage in sources.get(path, ())}
+    # Les étapes qui dépendent d'une étape relancée sont relancées aussi
+    for name in names:
+        if any(dep in hit for dep in STAGES[name][0]):
+            hit.add(name)
+    return [name for name in STAGES if name in hit]
+
+
+def watch(names, opts):
+    """
+    Premier passage complet, puis surveillance (polling) des sources : à chaque
+    modification, seules les étapes concernées sont relancées, dans ce processus,
+    avec les entrées déjà parsées en mémoire (sections / entrées inchangées
+    réutilisées) et le manifest de chaque étape pour ne réécrire que les XML
+    touchés.
+    """
+    # Les parsings restent en mémoire : inutile de relire / réécrire les snapshots
+    os.environ['ES_PANELS_NO_SNAPSHOT'] = '1'
+    opts.serial = True
+    build(names, opts)
+    opts.force = False
+    sources = watched_sources(names)
+    stamps = file_stamps(sources)
+    print(f'Surveillance de {len(sources)} fichier(s) toutes les {opts.interval:g} s (Ctrl+C pour arrêter)')
+    try:
+        while True:
+            time.sleep(opts.interval)
+            sources = watched_sources(names)
+            current = file_stamps(sources)
+            changed = sorted(p for p in set(stamps) | set(current) if stamps.get(p) != current.get(p))
+            if not changed:
+                continue
+            t0 = time.perf_counter()
+            before = {path: _parsed(path) for path in changed}
+            stages = affected_stages(changed, sources, names)
+            report = [r for lane in plan_lanes(stages) for r in run_lane(lane, opts)]
+            print(time.strftime('[%H:%M:%S]'))
+            for path in changed:
+                print(f'  {describe_change(path, before[path], _parsed(path))}')
+            print_outputs(report, opts.verbose)
+            for name, elapsed, failures, error, output in report:
+                summary = next((l for l in output.splitlines() if 'écrit(s)' in l), '')
+                status = summary if not failures else f'{failures} échec(s)'
+                print(f'  {name:<10}{elapsed:6.2f} s   {status}')
+            print(f'  {"total":<10}{time.perf_counter() - t0:6.2f} s')
+            # État d'avant le passage : une source modifiée pendant le passage
+            # redéclenche le suivant. Seules les sorties écrites (retroarch/*.xml)
+            # prennent leur nouvel état, pour ne pas relancer systems en boucle.
+            stamps = current
+            if 'retroarch' in stages:
+                import genSystems
+                outputs = [p for p in set(watched_sources(names)) | set(current)
+                           if os.path.dirname(p) == genSystems.RETROARCH_DIR]
+                for path in outputs:
+                    stamps.pop(path, None)
+                stamps.update(file_stamps(outputs))
+    except KeyboardInterrupt:
+        print('Arrêt de la surveillance.')
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reconstruit tous les layouts (mame, fbneo, retroarch, systems)')
+    parser.add_argument('stages', nargs='*', metavar='ÉTAPE',
+                        help=f'étapes à lancer parmi {", ".join(STAGES)} (défaut : toutes)')
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    add_bundle_argument(parser)
+    add_db_argument(parser)
+    add_leds_argument(parser)
+    parser.add_argument('--serial', action='store_true', help='enchaîne les étapes dans ce processus')
+    parser.add_argument('-v', '--verbose', action='store_true', help='affiche la sortie de chaque étape')
+    parser.add_argument('--watch', action='store_true',
+                        help='reste actif et régénère les XML concernés à chaque modification des sources')
+    parser.add_argument('--interval', type=float, default=0.5, help='période de scrutation en secondes (défaut 0.5)')
+    opts = parser.parse_args(argv)
+    unknown = [n for n in opts.stages if n not in STAGES]
+    if unknown:
+        parser.error(f'étape(s) inconnue(s) : {", ".join(unknown)}')
+    names = [n for n in STAGES if n in opts.stages] if opts.stages else list(STAGES)
+    if opts.watch:
+        return watch(names, opts)
+    return 1 if build(names, opts) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import glob
+import json
+import hashlib
+
+# ————————————————————————————————————————————
+# Manifest de régénération incrémentale.
+# Pour chaque ROM / système on mémorise une empreinte de ses entrées
+# (section(s) INI, entrée YAML, XML du core retroarch, version du générateur).
+# Au passage suivant, seules les entrées dont l'empreinte a changé sont
+# régénérées, et les sorties des entrées disparues sont supprimées.
+
+CACHE_DIR = '.cache'
+
+
+def digest(*parts) -> str:
+    """Empreinte stable d'un ensemble d'entrées (dicts, listes, str, bytes)."""
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, default=str).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def file_bytes(path):
+    """Contenu d'un fichier d'entrée, ou None s'il n'existe pas."""
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def watched_sources(names):
+    """{chemin: [étapes]} des fichiers d'entrée des étapes `names` (mame, fbneo, retroarch, systems)."""
+    import genMame, genFbNeo, genSystems
+    inputs = {
+        'mame':      genMame.COLOR_INIS + [genMame.CONTROLS_INI],
+        'fbneo':     genFbNeo.COLOR_INIS + [genFbNeo.CONTROLS_YAML],
+        'retroarch': sorted(glob.glob(os.path.join('libreto', '*.md'))),
+        # Les cores retroarch/*.xml peuvent aussi être retouchés à la main
+        'systems':   [genSystems.SYSTEMS_INI]
+                     + sorted(glob.glob(os.path.join(genSystems.RETROARCH_DIR, '*.xml'))),
+    }
+    sources = {}
+    for name in names:
+        for path in inputs[name]:
+            sources.setdefault(path, []).append(name)
+    return sources
+
+
+def file_stamps(paths) -> dict:
+    """{chemin: (taille, mtime)} des fichiers existants de `paths`, pour détecter une modification."""
+    stamps = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamps[path] = (st.st_size, st.st_mtime_ns)
+    return stamps
+
+
+class Manifest:
+    """Empreintes par entrée pour un dossier de sortie (mame, fbneo, systems…)."""
+
+    def __init__(self, name: str, version, force=False):
+        self.path = os.path.join(CACHE_DIR, f'{name}.json')
+        self.version = version
+        previous, previous_meta = {}, {}
+        same_version = False
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                previous = data.get('entries', {})
+                previous_meta = data.get('meta', {})
+                same_version = data.get('version') == version
+            except (OSError, ValueError):
+                previous = {}
+        # Les clés connues servent au nettoyage même si la version a changé
+        self._known = set(previous)
+        self.entries = dict(previous) if same_version and not force else {}
+        # Infos libres par entrée (ex. statut d'une doc), conservées avec l'empreinte
+        self.meta = {k: v for k, v in previous_meta.items() if k in self.entries}
+
+    def is_fresh(self, key, dig, output) -> bool:
+        return self.entries.get(key) == dig and os.path.isfile(output)
+
+    def record(self, key, dig, meta=None):
+        self.entries[key] = dig
+        self._known.add(key)
+        if meta is None:
+            self.meta.pop(key, None)
+        else:
+            self.meta[key] = meta
+
+    def prune(self, current_keys, output_for, writer) -> list:
+        """Supprime (via `writer`) les sorties des entrées disparues ; retourne leurs clés."""
+        current = set(current_keys)
+        removed = []
+        for key in sorted(self._known - current):
+            if writer.remove(output_for(key)):
+                removed.append(key)
+            self.entries.pop(key, None)
+            self.meta.pop(key, None)
+        self._known &= current
+        return removed
+
+    def save(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = self.path + '.tmp'
+        data = {'version': self.version, 'entries': self.entries}
+        if self.meta:
+            data['meta'] = self.meta
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, sort_keys=True, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+
+def add_force_argument(parser):
+    parser.add_argument('--force', action='store_true',
+                        help='ignore le manifest et régénère toutes les sorties')
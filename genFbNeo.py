@@ -1,28 +1,51 @@
 import os
 import sys
-import configparser
+import time
+import argparse
 
-# Attempt to import a YAML parser and define a unified load function
+# Attempt to import a YAML parser and define a unified load function.
+# PyYAML's libyaml binding (CSafeLoader) is preferred; it builds the same
+# mappings as the pure-Python SafeLoader, only much faster.
 try:
     import yaml
-    _load_yaml = yaml.safe_load
+    try:
+        from yaml import CSafeLoader as _YamlLoader
+        YAML_BACKEND = 'PyYAML + libyaml (CSafeLoader)'
+    except ImportError:
+        from yaml import SafeLoader as _YamlLoader
+        YAML_BACKEND = 'PyYAML pure Python (SafeLoader)'
+
+    def _load_yaml(stream):
+        return yaml.load(stream, Loader=_YamlLoader)
 except ImportError:
     try:
         from ruamel.yaml import YAML
         yaml_parser = YAML()
         _load_yaml = yaml_parser.load
+        YAML_BACKEND = 'ruamel.yaml'
     except ImportError:
         print('Error: PyYAML or ruamel.yaml is required. Please install with pip install pyyaml ruamel.yaml')
         sys.exit(1)
 
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from buildManifest import Manifest, add_force_argument, digest
+from iniIndex import load_ini_index
+from layoutModel import Button, GameLayout, Layout, game_xml, to_element
+from inputSnapshot import load_cached
+from outputWriter import OutputWriter
+from palette import intern_ini, report_unknown, table
+from romPool import add_jobs_argument, map_roms, report_failures
+from xmlWriter import pretty_xml
 
 # Configuration files
 COLOR_INIS = ['ledspicer-arcade-colors.ini', 'ledblinky-arcade-colors.ini']
 CONTROLS_YAML = 'fbneo.yml'
+# INI value → shared Color (common palette)
+_COLORS = table()
 OUTPUT_DIR = 'fbneo'
 
+# Bump whenever the generation logic changes (invalidates the manifest)
+GENERATOR_VERSION = 1
+
 STATIC_POSITIONS = {
     '1': (30, 60), '2': (50, 60), '3': (30, 40), '4': (50, 40),
     '5': (70, 40), '6': (70, 60), '7': (90, 40), '8': (90, 60),
@@ -55,38 +78,85 @@ PANEL_IDS = {
     '2-Button': ['1', '2'],
 }
 
+# physical -> (physical, controller, dinput), resolved once at import time
+PHYS_CHAIN = {phys: (phys, DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN'), dinput)
+              for phys, dinput in PHYS_TO_DINPUT.items()}
+PANEL_CHAINS = {panel: tuple(PHYS_CHAIN[p] for p in ids) for panel, ids in PANEL_IDS.items()}
+# 2-Button candidates: 8-, 6- then 4-Button order (repeats included, as before)
+TWO_BUTTON_CANDIDATES = tuple(PHYS_CHAIN[p] for panel in ('8-Button', '6-Button', '4-Button')
+                              for p in PANEL_IDS[panel])
+
 
 def load_color_config():
-    cfg = configparser.ConfigParser()
-    cfg.optionxform = str
-    cfg.read(COLOR_INIS)
-    return cfg
+    color_cfg = load_ini_index(COLOR_INIS)
+    # Resolve every color name once (shared palette) before generating
+    report_unknown(intern_ini(color_cfg), ', '.join(COLOR_INIS))
+    return color_cfg
 
 
-def load_controls():
+def _parse_controls():
     with open(CONTROLS_YAML, 'r') as f:
         data = _load_yaml(f)
     return {str(rom).lower(): mapping for rom, mapping in data.items()}
 
 
+# Controls already loaded by this process: (size, mtime_ns) of fbneo.yml -> dict
+_CONTROLS = {}
+
+
+def load_controls(verbose=True):
+    # Parsed YAML is kept in a binary snapshot, rebuilt when fbneo.yml changes
+    t0 = time.perf_counter()
+    st = os.stat(CONTROLS_YAML)
+    stamp = (st.st_size, st.st_mtime_ns)
+    controls = _CONTROLS.get(stamp)
+    in_memory = controls is not None
+    from_snapshot = False
+    if not in_memory:
+        controls, from_snapshot = load_cached('fbneo-controls', [CONTROLS_YAML], _parse_controls, with_hit=True)
+        _CONTROLS.clear()
+        _CONTROLS[stamp] = controls
+    elapsed = time.perf_counter() - t0
+    if verbose:
+        if in_memory:
+            source = 'already in memory'
+        else:
+            source = f'snapshot, parser {YAML_BACKEND}' if from_snapshot else YAML_BACKEND
+        print(f'{CONTROLS_YAML}: {len(controls)} ROMs loaded in {elapsed * 1000:.1f} ms ({source})')
+    return controls
+
+
+def cached_controls():
+    """Controls last loaded by this process, or None."""
+    return next(iter(_CONTROLS.values()), None)
+
+
 def prettify_xml(elem):
-    rough = ET.tostring(elem, 'utf-8')
-    parsed = minidom.parseString(rough)
-    return parsed.toprettyxml(indent='  ', encoding='utf-8')
+    return pretty_xml(elem, indent='  ', encoding='utf-8')
 
 
-def generate_xml_for_rom(rom, color_cfg, controls):
+def resolve_panels(inv):
+    """{panel: [(physical, controller, dinput, function)]} for one ROM's dinput -> function map."""
+    panels = {panel: [(p, ctrl, dinput, inv.get(dinput, 'None')) for p, ctrl, dinput in chain]
+              for panel, chain in PANEL_CHAINS.items()}
+    # 2-Button: the first two active buttons, left to right
+    active = [(p, ctrl, dinput, func) for p, ctrl, dinput in TWO_BUTTON_CANDIDATES
+              if (func := inv.get(dinput, 'None')) != 'None']
+    two = active[:2] if len(active) >= 2 else panels['2-Button']
+    two.sort(key=lambda b: STATIC_POSITIONS[b[0]][0])
+    panels['2-Button'] = two
+    return panels
+
+
+def game_layout_for_rom(rom, color_cfg, controls):
+    """Layout model of one ROM, or None if it has no controls entry."""
     rom_key = rom.lower()
     mapping = controls.get(rom_key)
     if not mapping:
         return None
 
-    # Find INI section (case-insensitive)
-    cfg_section = None
-    for section in color_cfg.sections():
-        if section.lower() == rom_key:
-            cfg_section = section
-            break
+    # Find INI section (case-insensitive, O(1) via the shared index)
+    cfg_section = color_cfg.section(rom_key)
 
     # Inverse mapping for functions
     ignore = {'players', 'coin', 'start', 'noplayer', 'service'}
@@ -96,7 +166,7 @@ def generate_xml_for_rom(rom, color_cfg, controls):
     # Determine default panel from available colors
     max_btn = 0
     if cfg_section:
-        for opt in color_cfg.options(cfg_section):
+        for opt in cfg_section:
             if opt.startswith('P1_BUTTON'):
                 try:
                     idx = int(opt.replace('P1_BUTTON', ''))
@@ -112,65 +182,27 @@ def generate_xml_for_rom(rom, color_cfg, controls):
     else:
         default_panel = '8-Button'
 
-    # Build default panel buttons_data
-    def_phys_list = PANEL_IDS[default_panel]
-    default_buttons = []
-    for phys in def_phys_list:
-        dinput = PHYS_TO_DINPUT[phys]
-        ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
-        func = inv.get(dinput, 'None')
-        default_buttons.append((phys, ctrl, dinput, func))
-    if default_panel == '2-Button':
-        # pick first two active
-        candidates = []
-        for panel in ['8-Button', '6-Button', '4-Button']:
-            for p in PANEL_IDS[panel]:
-                dinput = PHYS_TO_DINPUT[p]
-                ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
-                func = inv.get(dinput, 'None')
-                candidates.append((p, ctrl, dinput, func))
-        active = [b for b in candidates if b[3] != 'None']
-        if len(active) >= 2:
-            default_buttons = active[:2]
-        default_buttons.sort(key=lambda b: STATIC_POSITIONS[b[0]][0])
+    # Buttons of every panel, 2-Button pick resolved once for both uses
+    panel_buttons = resolve_panels(inv)
+    default_buttons = panel_buttons[default_panel]
+
     # Map functions to colors based on default panel order
     function_to_color = {}
     for idx, (_, _, _, func) in enumerate(default_buttons[:max_btn], start=1):
         if func != 'None' and cfg_section:
-            color_val = color_cfg.get(cfg_section, f'P1_BUTTON{idx}', fallback='Gray')
+            color_val = _COLORS[cfg_section.get(f'P1_BUTTON{idx}', 'Gray')].name
             function_to_color[func] = color_val
 
-    # Create XML structure
-    system = ET.Element('system', name='arcade')
-    game_el = ET.SubElement(system, 'game', name=rom, rom=rom)
-    layouts = ET.SubElement(game_el, 'layouts')
-    joy_color = color_cfg.get(cfg_section, 'P1_JOYSTICK', fallback='Gray') if cfg_section else 'Gray'
+    # Build the shared layout model
+    joy_color = _COLORS[cfg_section.get('P1_JOYSTICK', 'Gray')].name if cfg_section else 'Gray'
+    start_color = _COLORS[cfg_section.get('P1_START', 'White')].name if cfg_section else 'White'
+    coin_color = _COLORS[cfg_section.get('P1_COIN', 'White')].name if cfg_section else 'White'
+    layouts = []
 
     for layout_type, phys_list in PANEL_IDS.items():
         count = len(phys_list)
-        layout_el = ET.SubElement(layouts, 'layout', panelButtons=str(count), type=layout_type)
-        ET.SubElement(layout_el, 'joystick', color=joy_color)
-
-        # Gather button data for this layout
-        buttons_data = []
-        for phys in phys_list:
-            dinput = PHYS_TO_DINPUT[phys]
-            ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
-            func = inv.get(dinput, 'None')
-            buttons_data.append((phys, ctrl, dinput, func))
-        # 2-Button special
-        if count == 2:
-            candidates = []
-            for panel in ['8-Button', '6-Button', '4-Button']:
-                for p in PANEL_IDS[panel]:
-                    dinput = PHYS_TO_DINPUT[p]
-                    ctrl = DINPUT_TO_CONTROLLER.get(dinput, 'UNKNOWN')
-                    func = inv.get(dinput, 'None')
-                    candidates.append((p, ctrl, dinput, func))
-            active = [b for b in candidates if b[3] != 'None']
-            if len(active) >= 2:
-                buttons_data = active[:2]
-            buttons_data.sort(key=lambda b: STATIC_POSITIONS[b[0]][0])
+        buttons_data = panel_buttons[layout_type]
+        buttons = []
 
         # Place buttons and apply colors by function
         override_phys = (count == 2)
@@ -181,42 +213,96 @@ def generate_xml_for_rom(rom, color_cfg, controls):
                 color = function_to_color.get(func, 'Gray')
             else:
                 color = 'Black'
-            ET.SubElement(
-                layout_el, 'button',
-                id=str(idx), physical=phys_id,
-                controller=ctrl, gameButton=dinput,
-                x=str(x), y=str(y), color=color, function=func
-            )
+            buttons.append(Button(str(idx), phys_id, ctrl, dinput, x, y, color, func))
         # START and COIN
-        ET.SubElement(
-            layout_el, 'button', id='START', physical=str(count+1), controller='START',
-            gameButton=mapping.get('Start', 'start'),
-            x=str(START_POS[0]), y=str(START_POS[1]),
-            color=color_cfg.get(cfg_section, 'P1_START', fallback='White') if cfg_section else 'White',
-            function='Start'
-        )
-        ET.SubElement(
-            layout_el, 'button', id='COIN', physical=str(count+2), controller='SELECT',
-            gameButton=mapping.get('Coin', 'back'),
-            x=str(COIN_POS[0]), y=str(COIN_POS[1]),
-            color=color_cfg.get(cfg_section, 'P1_COIN', fallback='White') if cfg_section else 'White',
-            function='Coin'
-        )
-    return system
-
-
-def generate_all_xmls():
+        buttons.append(Button('START', str(count+1), 'START', mapping.get('Start', 'start'),
+                              START_POS[0], START_POS[1], start_color, 'Start'))
+        buttons.append(Button('COIN', str(count+2), 'SELECT', mapping.get('Coin', 'back'),
+                              COIN_POS[0], COIN_POS[1], coin_color, 'Coin'))
+        layouts.append(Layout(layout_type, count, joy_color, buttons))
+    return GameLayout('arcade', layouts, rom)
+
+
+def generate_xml_for_rom(rom, color_cfg, controls):
+    game = game_layout_for_rom(rom, color_cfg, controls)
+    return to_element(game) if game is not None else None
+
+
+# Worker state, filled once per process by the pool initializer
+_RENDER_STATE = {}
+
+
+def _init_render(color_cfg, controls):
+    _RENDER_STATE['color_cfg'] = color_cfg
+    _RENDER_STATE['controls'] = controls
+
+
+def render_rom(rom):
+    game = game_layout_for_rom(rom, _RENDER_STATE['color_cfg'], _RENDER_STATE['controls'])
+    if game is None:
+        return None
+    return game_xml(game)
+
+
+def rom_digest(rom, color_cfg, controls):
+    # Inputs actually read for this ROM: its YAML entry and its color section
+    return digest(GENERATOR_VERSION, rom, controls.get(rom), color_cfg.section(rom))
+
+
+def output_path(rom):
+    return os.path.join(OUTPUT_DIR, f'{rom}.xml')
+
+
+def generate_all_xmls(jobs=1, force=False):
     color_cfg = load_color_config()
     controls = load_controls()
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    for rom in controls:
-        xml_el = generate_xml_for_rom(rom, color_cfg, controls)
-        if xml_el is None:
+
+    # Only ROMs whose inputs changed since the last run are rebuilt
+    manifest = Manifest('fbneo', GENERATOR_VERSION, force)
+    digests = {rom: rom_digest(rom, color_cfg, controls) for rom in controls}
+    writer = OutputWriter()
+    # An empty YAML entry has no layout: recorded without queuing it (it would
+    # be rebuilt on every run), and a layout left by an earlier run is removed
+    empty = [rom for rom in controls if not controls[rom]]
+    for rom in empty:
+        writer.remove(output_path(rom))
+        manifest.record(rom, digests[rom])
+    todo = [rom for rom in controls
+            if controls[rom] and not manifest.is_fresh(rom, digests[rom], output_path(rom))]
+
+    results = map_roms(todo, render_rom, _init_render, (color_cfg, controls), jobs)
+    # Writes stay in the parent, in ROM order, whatever the number of workers
+    for rom, xml_bytes, err in results:
+        if xml_bytes is None:
             continue
-        xml_bytes = prettify_xml(xml_el)
-        with open(os.path.join(OUTPUT_DIR, f'{rom}.xml'), 'wb') as f:
-            f.write(xml_bytes)
+        writer.write(output_path(rom), xml_bytes)
+        manifest.record(rom, digests[rom])
+    manifest.prune(controls, output_path, writer)
+    manifest.save()
+    print(f'{len(todo)} régénéré(s), {len(controls) - len(todo) - len(empty)} à jour'
+          + (f', {len(empty)} sans contrôles' if empty else ''))
+    writer.report(OUTPUT_DIR)
+    return report_failures(results, 'fbneo')
 
 if __name__ == '__main__':
-    generate_all_xmls()
+    # Optional outputs: imported here to keep the launch path (launchGen) light
+    from layoutBundle import add_bundle_argument, pack_dir
+    from layoutDb import add_db_argument, update_db
+    from ledFrames import add_leds_argument, pack_dir as pack_leds
+    parser = argparse.ArgumentParser(description='Génère les XML fbneo/<rom>.xml')
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    add_bundle_argument(parser)
+    add_db_argument(parser)
+    add_leds_argument(parser)
+    args = parser.parse_args()
+    failed = generate_all_xmls(args.jobs, args.force)
+    if args.bundle:
+        print(f'Bundle : {pack_dir(OUTPUT_DIR)}')
+    if args.leds:
+        print(f'LED : {pack_leds(OUTPUT_DIR)}')
+    if args.db:
+        print(update_db('fbneo', OUTPUT_DIR, args.db))
     print('Génération fbneo XML terminée !')
+    sys.exit(1 if failed else 0)
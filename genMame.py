@@ -1,8 +1,14 @@
 import os
 import sys
-import configparser
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+import argparse
+
+from buildManifest import Manifest, add_force_argument, digest
+from iniIndex import load_ini_index
+from layoutModel import Button, GameLayout, Layout, game_xml, layouts_xml, to_element
+from outputWriter import OutputWriter
+from palette import intern_ini, report_unknown, table
+from romPool import add_jobs_argument, map_roms, report_failures
+from xmlWriter import pretty_xml
 
 # Config files
 COLOR_INIS = [
@@ -13,6 +19,9 @@ COLOR_INIS = [
 CONTROLS_INI = 'ledblinky-arcade-controls.ini'
 OUTPUT_DIR = 'mame'
 
+# À incrémenter dès que la logique de génération change (invalide le manifest)
+GENERATOR_VERSION = 1
+
 # NeoGeo ROM set
 NEOGEO_ROMS = {
     '2020bb', '3countb', 'afighters', 'afighters2', 'aggressors',
@@ -58,6 +67,16 @@ PANEL_IDS = {
     '8-Button': ['4', '3', '5', '7', '1', '2', '6', '8'],
 }
 
+# Bouton physique de P1_BUTTON1, P1_BUTTON2… selon le panel par défaut
+BUTTON_PHYS_ORDER = {
+    # → Si ≤ 4 boutons, on impose l’ordre phys=A,B,Y,X → ['1','2','4','3']
+    '2-Button': ['1', '2', '4', '3'],
+    '4-Button': ['1', '2', '4', '3'],
+    '6-Button': ['3', '4', '5', '1', '2', '6'],
+    # Pour 8 boutons, on prend top→bottom
+    '8-Button': PANEL_IDS['8-Button'],
+}
+
 # NeoGeo special mappings
 NEO_GAMEBTN_MAP = {
     '2-Button': {'1': 'A', '2': 'B'},
@@ -80,47 +99,41 @@ RB_CONTROLLER_MAP = {
 START_POS = (85, 90)
 COIN_POS = (95, 90)
 JOYSTICK_DEFAULT_COLOR = 'Gray'
+# Valeur INI → Color partagé (palette commune)
+_COLORS = table()
 
-# Load configurations
+# Load configurations (index partagé, chargé une seule fois par exécution)
 def load_configurations():
-    color_cfg = configparser.ConfigParser()
-    color_cfg.optionxform = str
-    color_cfg.read(COLOR_INIS)
-
-    func_cfg = configparser.ConfigParser(strict=False)
-    func_cfg.optionxform = str
-    func_cfg.read(CONTROLS_INI)
-
+    color_cfg = load_ini_index(COLOR_INIS)
+    # Couleurs résolues une fois (palette commune) avant la génération
+    report_unknown(intern_ini(color_cfg), ', '.join(COLOR_INIS))
+    func_cfg = load_ini_index(CONTROLS_INI, strict=False)
     return color_cfg, func_cfg
 
 # Safe get
 def get_value(cfg, section, option, fallback):
-    try:
-        return cfg.get(section, option)
-    except:
-        return fallback
+    return cfg.get(section, option, fallback)
 
 # Pretty-print XML
 def prettify_xml(elem):
-    rough = ET.tostring(elem, 'utf-8')
-    parsed = minidom.parseString(rough)
-    return parsed.toprettyxml(indent='  ', encoding='utf-8')
+    return pretty_xml(elem, indent='  ', encoding='utf-8')
 
-# Generate XML for one ROM
-def generate_xml_for_rom(rom, color_cfg, func_cfg):
+# Signature canonique des layouts d'une ROM : tout ce dont dépend le bloc
+# <layouts> (hors nom de la ROM). Deux ROMs de même signature ont des layouts
+# identiques ; toutes les ROMs NeoGeo partagent la même.
+def layout_signature(rom, color_cfg, func_cfg):
     rom_key = rom.lower()
     is_neo = (rom_key in NEOGEO_ROMS)
-    panel_map = PANEL_IDS
 
     # Determine color section
     section = 'neogeo' if is_neo else rom_key
-    cfg_section = next((s for s in color_cfg.sections() if s.lower() == section), None)
+    cfg_section = section if section in color_cfg else None
 
     # Determine default panel and build func_map_phys = {phys: (fonction, couleur)}
     default_panel = '2-Button'
     func_map_phys = {}
     if cfg_section and not is_neo:
-        btn_opts = [k for k in color_cfg.options(cfg_section) if k.startswith('P1_BUTTON')]
+        btn_opts = [k for k in color_cfg.section(cfg_section) if k.startswith('P1_BUTTON')]
         max_btn = max((int(k.replace('P1_BUTTON','')) for k in btn_opts), default=0)
         default_panel = (
             '2-Button' if max_btn <= 2 else
@@ -128,32 +141,34 @@ def generate_xml_for_rom(rom, color_cfg, func_cfg):
             '6-Button' if max_btn <= 6 else
             '8-Button'
         )
-        # → Si ≤ 4 boutons, on impose l’ordre phys=A,B,Y,X → ['1','2','4','3']
-        if max_btn <= 4:
-            phys_order = ['1','2','4','3'][:max_btn]
-        elif max_btn <= 6 and max_btn > 4:
-            phys_order = ['3','4','5','1','2','6'][:max_btn]
-        else:
-            # Pour 6 ou 8 boutons, on prend top→bottom
-            phys_order = PANEL_IDS[default_panel][:max_btn]
+        phys_order = BUTTON_PHYS_ORDER[default_panel][:max_btn]
         for idx, phys in enumerate(phys_order, start=1):
             func = get_value(func_cfg, rom_key, f'P1_BUTTON{idx}', 'None')
             if func != 'None':
-                col = get_value(color_cfg, cfg_section, f'P1_BUTTON{idx}', 'Gray')
+                col = _COLORS[get_value(color_cfg, cfg_section, f'P1_BUTTON{idx}', 'Gray')].name
                 func_map_phys[phys] = (func, col)
 
-    # Build XML tree
-    system = ET.Element('system', name='arcade')
-    game_el = ET.SubElement(system, 'game', name=rom, rom=rom)
-    layouts_el = ET.SubElement(game_el, 'layouts')
-
     # Joystick color (noir si NeoGeo, sinon depuis l'INI)
-    joy_col = get_value(color_cfg, cfg_section, 'P1_JOYSTICK', JOYSTICK_DEFAULT_COLOR) if cfg_section else JOYSTICK_DEFAULT_COLOR
+    joy_col = _COLORS[get_value(color_cfg, cfg_section, 'P1_JOYSTICK', JOYSTICK_DEFAULT_COLOR)].name if cfg_section else JOYSTICK_DEFAULT_COLOR
     joystick_color = 'Black' if is_neo else joy_col
+    neo_funcs = tuple(get_value(func_cfg, 'neogeo', f'P1_BUTTON{i}', 'None')
+                      for i in range(1, 9)) if is_neo else ()
+
+    return (
+        is_neo, default_panel, tuple(func_map_phys.items()), neo_funcs, joystick_color,
+        _COLORS[get_value(color_cfg, cfg_section, 'P1_START', 'White')].name,
+        _COLORS[get_value(color_cfg, cfg_section, 'P1_COIN', 'White')].name,
+    )
+
+# Layouts (modèle commun) construits à partir d'une signature
+def build_layouts(signature):
+    is_neo, default_panel, func_items, neo_funcs, joystick_color, start_col, coin_col = signature
+    func_map_phys = dict(func_items)
+    panel_map = PANEL_IDS
+    layouts = []
 
     for layout_type, ids in panel_map.items():
-        lay = ET.SubElement(layouts_el, 'layout', panelButtons=str(len(ids)), type=layout_type)
-        ET.SubElement(lay, 'joystick', color=joystick_color)
+        buttons = []
 
         # --- Cas 2-Button : on prend les 2 premières touches actives
         if not is_neo and layout_type == '2-Button':
@@ -172,12 +187,7 @@ def generate_xml_for_rom(rom, color_cfg, func_cfg):
                 game_btn = ('L1' if controller == 'PAGEUP'
                             else 'R1' if controller == 'PAGEDOWN'
                             else controller)
-                ET.SubElement(
-                    lay, 'button',
-                    id=str(idx), physical=phys,
-                    controller=controller, gameButton=game_btn,
-                    x=str(x), y=str(y), color=color, function=func
-                )
+                buttons.append(Button(str(idx), phys, controller, game_btn, x, y, color, func))
             # Si on a moins de 2 touches actives, ajouter un bouton « None » dans la ou les cases restantes
             for idx in range(len(active_two) + 1, 3):
                 x, y = STATIC_POSITIONS[str(idx)]
@@ -185,12 +195,7 @@ def generate_xml_for_rom(rom, color_cfg, func_cfg):
                 game_btn = ('L1' if controller == 'PAGEUP'
                             else 'R1' if controller == 'PAGEDOWN'
                             else controller)
-                ET.SubElement(
-                    lay, 'button',
-                    id=str(idx), physical=str(idx),
-                    controller=controller, gameButton=game_btn,
-                    x=str(x), y=str(y), color='Black', function='None'
-                )
+                buttons.append(Button(str(idx), str(idx), controller, game_btn, x, y, 'Black', 'None'))
 
         else:
             # --- Pour 4, 6, 8 boutons (ou NeoGeo) : on parcourt simplement ids
@@ -200,8 +205,7 @@ def generate_xml_for_rom(rom, color_cfg, func_cfg):
                     mapping = NEO_GAMEBTN_MAP.get(layout_type, {})
                     letter = mapping.get(phys)
                     if letter:
-                        func = get_value(func_cfg, 'neogeo',
-                                        f'P1_BUTTON{list(mapping.values()).index(letter)+1}', 'None')
+                        func = neo_funcs[list(mapping.values()).index(letter)]
                         color = NEO_BUTTON_COLORS.get(letter, 'Black')
                     else:
                         func = 'None'
@@ -215,44 +219,135 @@ def generate_xml_for_rom(rom, color_cfg, func_cfg):
                                 else 'R1' if controller == 'PAGEDOWN'
                                 else controller)
 
-                ET.SubElement(
-                    lay, 'button',
-                    id=phys, physical=phys,
-                    controller=controller, gameButton=game_btn,
-                    x=str(x), y=str(y), color=color, function=func
-                )
+                buttons.append(Button(phys, phys, controller, game_btn, x, y, color, func))
 
         # Ajouter toujours START & COIN
-        sp = str(len(ids) + 1)
-        cp = str(len(ids) + 2)
-        ET.SubElement(
-            lay, 'button',
-            id='START', physical=sp,
-            controller='START', gameButton='START',
-            x=str(START_POS[0]), y=str(START_POS[1]),
-            color=get_value(color_cfg, cfg_section, 'P1_START', 'White'),
-            function='Start'
-        )
-        ET.SubElement(
-            lay, 'button',
-            id='COIN', physical=cp,
-            controller='SELECT', gameButton='COIN',
-            x=str(COIN_POS[0]), y=str(COIN_POS[1]),
-            color=get_value(color_cfg, cfg_section, 'P1_COIN', 'White'),
-            function='Coin'
-        )
+        buttons.append(Button('START', str(len(ids) + 1), 'START', 'START',
+                              START_POS[0], START_POS[1], start_col, 'Start'))
+        buttons.append(Button('COIN', str(len(ids) + 2), 'SELECT', 'COIN',
+                              COIN_POS[0], COIN_POS[1], coin_col, 'Coin'))
+        layouts.append(Layout(layout_type, len(ids), joystick_color, buttons))
 
-    return system
+    return layouts
 
-# Main
-if __name__ == '__main__':
+# Document d'une ROM autour de ses layouts
+def game_document(rom, layouts):
+    return GameLayout('arcade', layouts, rom)
+
+# Modèle du layout d'une ROM
+def game_layout_for_rom(rom, color_cfg, func_cfg):
+    return game_document(rom, build_layouts(layout_signature(rom, color_cfg, func_cfg)))
+
+# Generate XML for one ROM
+def generate_xml_for_rom(rom, color_cfg, func_cfg):
+    return to_element(game_layout_for_rom(rom, color_cfg, func_cfg))
+
+# État du worker, rempli une fois par processus par l'initializer du pool
+_RENDER_STATE = {}
+
+def _init_render(color_cfg, func_cfg):
+    _RENDER_STATE['color_cfg'] = color_cfg
+    _RENDER_STATE['func_cfg'] = func_cfg
+
+# Layouts déjà construits et sérialisés : {signature: (layouts, texte XML)}
+_LAYOUTS = {}
+
+def shared_layouts(signature):
+    hit = _LAYOUTS.get(signature)
+    if hit is None:
+        layouts = build_layouts(signature)
+        # <layouts> est toujours à la profondeur 2 (system > game > layouts)
+        hit = _LAYOUTS[signature] = (layouts, layouts_xml(layouts, depth=2))
+    return hit
+
+def render_rom(rom):
+    signature = layout_signature(rom, _RENDER_STATE['color_cfg'], _RENDER_STATE['func_cfg'])
+    layouts, text = shared_layouts(signature)
+    return game_xml(game_document(rom, layouts), layouts_text=text)
+
+# Nombre de layouts distincts parmi les ROMs
+def layout_stats(roms, color_cfg, func_cfg, top=0):
+    by_signature = {}
+    for rom in roms:
+        by_signature.setdefault(layout_signature(rom, color_cfg, func_cfg), []).append(rom)
+    shared = sum(1 for group in by_signature.values() if len(group) > 1)
+    print(f'Layouts : {len(by_signature)} distinct(s) pour {len(roms)} ROMs '
+          f'({shared} partagé(s) par plusieurs ROMs)')
+    groups = sorted(by_signature.items(), key=lambda item: -len(item[1]))
+    for signature, group in groups[:top]:
+        is_neo, default_panel, func_items = signature[:3]
+        label = 'NeoGeo' if is_neo else f'{default_panel}, {len(func_items)} fonction(s)'
+        sample = ', '.join(group[:5]) + (', …' if len(group) > 5 else '')
+        print(f'  {len(group):5d} ROMs  [{label}]  {sample}')
+    return len(by_signature)
+
+# Liste triée des ROMs à générer
+def list_roms(func_cfg):
+    func_roms = {s.lower() for s in func_cfg.names() if s not in ('DEFAULT','neogeo')}
+    return sorted(func_roms.union(NEOGEO_ROMS))
+
+# Empreinte des entrées d'une ROM : sections couleur / fonctions réellement lues
+def rom_digest(rom, color_cfg, func_cfg):
+    rom_key = rom.lower()
+    is_neo = rom_key in NEOGEO_ROMS
+    return digest(
+        GENERATOR_VERSION, rom, is_neo,
+        color_cfg.section('neogeo' if is_neo else rom_key),
+        func_cfg.section('neogeo' if is_neo else rom_key),
+    )
+
+def output_path(rom):
+    return os.path.join(OUTPUT_DIR, f'{rom}.xml')
+
+def generate_all_xmls(jobs=1, force=False, stats=0):
     color_cfg, func_cfg = load_configurations()
-    func_roms = {s.lower() for s in func_cfg.sections() if s not in ('DEFAULT','neogeo')}
-    all_roms = sorted(func_roms.union(NEOGEO_ROMS))
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    for rom in all_roms:
-        xml_root = generate_xml_for_rom(rom, color_cfg, func_cfg)
-        xml_bytes = prettify_xml(xml_root)
-        with open(os.path.join(OUTPUT_DIR, f'{rom}.xml'), 'wb') as f:
-            f.write(xml_bytes)
+    roms = list_roms(func_cfg)
+    # Statistiques de partage seulement sur demande (--stats) : elles recalculent
+    # la signature de toutes les ROMs, même quand le manifest n'a rien à régénérer
+    if stats:
+        layout_stats(roms, color_cfg, func_cfg, stats)
+
+    # Seules les ROMs dont les entrées ont changé sont régénérées
+    manifest = Manifest('mame', GENERATOR_VERSION, force)
+    digests = {rom: rom_digest(rom, color_cfg, func_cfg) for rom in roms}
+    todo = [rom for rom in roms if not manifest.is_fresh(rom, digests[rom], output_path(rom))]
+
+    results = map_roms(todo, render_rom, _init_render, (color_cfg, func_cfg), jobs)
+    # Écritures dans le processus parent, dans l'ordre des ROMs
+    writer = OutputWriter()
+    for rom, xml_bytes, err in results:
+        if xml_bytes is None:
+            continue
+        writer.write(output_path(rom), xml_bytes)
+        manifest.record(rom, digests[rom])
+    manifest.prune(roms, output_path, writer)
+    manifest.save()
+    print(f'{len(todo)} régénéré(s), {len(roms) - len(todo)} à jour')
+    writer.report(OUTPUT_DIR)
+    return report_failures(results, 'mame')
+
+# Main
+if __name__ == '__main__':
+    # Sorties optionnelles : importées ici pour ne pas alourdir le chemin de lancement (launchGen)
+    from layoutBundle import add_bundle_argument, pack_dir
+    from layoutDb import add_db_argument, update_db
+    from ledFrames import add_leds_argument, pack_dir as pack_leds
+    parser = argparse.ArgumentParser(description='Génère les XML mame/<rom>.xml')
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    add_bundle_argument(parser)
+    add_db_argument(parser)
+    add_leds_argument(parser)
+    parser.add_argument('--stats', type=int, nargs='?', const=10, default=0, metavar='N',
+                        help='affiche le partage des layouts et les N plus partagés (défaut 10)')
+    args = parser.parse_args()
+    failed = generate_all_xmls(args.jobs, args.force, args.stats)
+    if args.bundle:
+        print(f'Bundle : {pack_dir(OUTPUT_DIR)}')
+    if args.leds:
+        print(f'LED : {pack_leds(OUTPUT_DIR)}')
+    if args.db:
+        print(update_db('mame', OUTPUT_DIR, args.db))
     print('Génération terminée !')
+    sys.exit(1 if failed else 0)
@@ -1,9 +1,20 @@
+import os
 import re
+import sys
+import argparse
 from pathlib import Path
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
 from urllib.parse import unquote, urlparse
 
+from buildManifest import Manifest, add_force_argument, digest, file_bytes
+from outputWriter import OutputWriter
+from retroarchCore import core_port_maps
+from romPool import add_jobs_argument, map_roms, report_failures
+from xmlWriter import pretty_xml
+
+# À incrémenter quand le format XML produit change (invalide le manifest)
+GENERATOR_VERSION = 1
+
 # Mapping machine → liste des émulateurs libretro officiels
 MACHINE_TO_EMUS = {
     '3do':            ['opera', '4do'],
@@ -212,18 +223,19 @@ DIRECTIONS = {
 }
 
 def prettify(elem):
-    raw = ET.tostring(elem, 'utf-8')
-    return minidom.parseString(raw).toprettyxml(indent="  ")
-
-def extract_table(lines, idx):
-    rows = []
-    for l in lines[idx+1:]:
-        if not l.startswith('|'):
-            break
-        if set(l.strip()) <= set('|- '):
-            continue
-        rows.append(l.rstrip())
-    return rows
+    return pretty_xml(elem, indent="  ", encoding=None)
+
+# Motifs compilés une seule fois pour tout le parsing
+RETROPAD_IMG   = '../image/retropad/'
+RE_IMAGE       = re.compile(r'/([^/]+?)\.(?:png|jpg|svg)')
+RE_MD_LINK     = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+RE_BRACKETS    = re.compile(r'[\[\]\(\)]')
+RE_RETRO_IMAGE = re.compile(r'\.\./image/retropad/retro_([a-z0-9_]+)\.png')
+SEPARATOR_CHARS = frozenset('|- ')
+
+def split_cells(line):
+    """Découpe une ligne de tableau markdown en cellules (une seule fois par ligne)."""
+    return [c.strip() for c in line.strip().strip('|').split('|')]
 
 def find_header_indices(headers):
     idx_desc = next((i for i,h in enumerate(headers)
@@ -236,8 +248,8 @@ def find_header_indices(headers):
 
 def clean_group_name(raw):
     # retire [texte](url), crochets et parenthèses
-    s = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', raw)
-    s = re.sub(r'[\[\]\(\)]', '', s).strip()
+    s = RE_MD_LINK.sub(r'\1', raw)
+    s = RE_BRACKETS.sub('', s).strip()
     return s or 'default'
 
 def extract_sysent(cell):
@@ -245,7 +257,7 @@ def extract_sysent(cell):
     Si cell contient un markdown image, extrait le nom de fichier
     et ne garde que la partie après le premier underscore.
     """
-    m = re.search(r'/([^/]+?)\.(?:png|jpg|svg)', cell)
+    m = RE_IMAGE.search(cell)
     if m:
         name = m.group(1)
         if '_' in name:
@@ -257,54 +269,74 @@ def fallback_scan(lines):
     seen = set()
     out = []
     for l in lines:
-        for m in re.finditer(r'\.\./image/retropad/retro_([a-z0-9_]+)\.png', l):
+        for m in RE_RETRO_IMAGE.finditer(l):
             k = m.group(1).lower()
             if k in seen: continue
             seen.add(k)
             out.append((k, k.upper(), ''))
     return out
 
-def process_md(md_path, out_dir):
+def table_groups(headers, rows, last_heading):
+    """
+    Tous les groupes d'un tableau (une colonne système = un groupe),
+    produits en un seul passage sur les lignes déjà découpées en cellules.
+    """
+    idx_desc, idx_rp, system_cols = find_header_indices(headers)
+    if idx_rp is None and rows:
+        idx_rp = next((j for j,v in enumerate(rows[0]) if RETROPAD_IMG in v), None)
+    if idx_rp is None:
+        return []
+    columns = [(sys_idx, []) for sys_idx in system_cols]
+    for cells in rows:
+        if idx_rp >= len(cells): continue
+        mimg = RE_IMAGE.search(cells[idx_rp])
+        if not mimg: continue
+        key  = mimg.group(1).replace('retro_','').lower()
+        desc = cells[idx_desc] if idx_desc is not None and idx_desc<len(cells) else ''
+        for sys_idx, mappings in columns:
+            sysent = extract_sysent(cells[sys_idx] if sys_idx<len(cells) else '')
+            mappings.append((key, desc or sysent, sysent))
+    return [{'name':clean_group_name(headers[sys_idx] or last_heading), 'mappings':mappings}
+            for sys_idx, mappings in columns if mappings]
+
+def parse_md(md_path):
+    """Extrait les groupes de mapping RetroPad d'une doc libretro."""
     lines = md_path.read_text(encoding='utf-8').splitlines()
+    n = len(lines)
+
+    # Tokenisation unique : fin du bloc de tableau, séparateurs, cellules
+    is_row = [l.startswith('|') for l in lines]
+    is_sep = [r and set(l.strip()) <= SEPARATOR_CHARS for l, r in zip(lines, is_row)]
+    block_end = [0] * (n + 1)
+    for j in range(n - 1, -1, -1):
+        block_end[j] = (block_end[j+1] if is_row[j+1:j+2] == [True] else j + 1) if is_row[j] else j
+    cells = {}
+    def cells_of(j):
+        c = cells.get(j)
+        if c is None:
+            c = cells[j] = split_cells(lines[j])
+        return c
+
     groups = []
     last_heading = 'default'
     i = 0
-
-    while i < len(lines):
+    while i < n:
         line = lines[i]
         if line.startswith('####'):
             last_heading = clean_group_name(line.lstrip('#').strip())
             i += 1
             continue
 
-        if line.startswith('|'):
-            tbl = extract_table(lines, i)
-            if any('../image/retropad/' in r for r in tbl):
-                headers = [c.strip() for c in line.strip().strip('|').split('|')]
-                idx_desc, idx_rp, system_cols = find_header_indices(headers)
-                if idx_rp is None and tbl:
-                    first = [c.strip() for c in tbl[0].strip().strip('|').split('|')]
-                    idx_rp = next((j for j,v in enumerate(first)
-                                   if '../image/retropad/' in v), None)
-                for sys_idx in system_cols:
-                    grp_name = clean_group_name(headers[sys_idx] or last_heading)
-                    mappings = []
-                    for row in tbl:
-                        cells = [c.strip() for c in row.strip().strip('|').split('|')]
-                        if idx_rp is None or idx_rp >= len(cells): continue
-                        mimg = re.search(r'/([^/]+?)\.(?:png|jpg|svg)', cells[idx_rp])
-                        if not mimg: continue
-                        key = mimg.group(1).replace('retro_','').lower()
-                        desc = (cells[idx_desc]
-                                if idx_desc is not None and idx_desc<len(cells) else '')
-                        raw_sys = cells[sys_idx] if sys_idx<len(cells) else ''
-                        sysent = extract_sysent(raw_sys)
-                        text = desc or sysent
-                        mappings.append((key, text, sysent))
-                    if mappings:
-                        groups.append({'name':grp_name, 'mappings':mappings})
-                i += len(tbl) + 1
+        if is_row[i]:
+            rows = [j for j in range(i + 1, block_end[i]) if not is_sep[j]]
+            if any(RETROPAD_IMG in lines[j] for j in rows):
+                groups.extend(table_groups(cells_of(i), [cells_of(j) for j in rows], last_heading))
+                # Même reprise que l'ancien parcours (lignes séparatrices non comptées)
+                i += len(rows) + 1
                 continue
+            # Aucune ligne du bloc n'a d'image RetroPad : aucun sous-tableau non plus
+            i = block_end[i]
+            continue
 
         i += 1
 
@@ -312,7 +344,10 @@ def process_md(md_path, out_dir):
         fb = fallback_scan(lines)
         if fb:
             groups = [{'name':'default','mappings':fb}]
+    return groups
 
+def build_core(md_path, groups):
+    """Arbre XML retroarch/<core>.xml construit à partir des groupes parsés : (racine, ok)."""
     core = md_path.stem
     machines = EMU_TO_MACHINES.get(core, []) or [core]
     sys_name = ",".join(sorted(set(machines)))
@@ -344,24 +379,82 @@ def process_md(md_path, out_dir):
                 if sysent:                at['system_entry'] = sysent
                 ET.SubElement(p, 'newseq', at).text = text
 
-    xml = prettify(root)
+    return root, ok
+
+def render_core(md_path, groups):
+    """XML retroarch/<core>.xml (texte) construit à partir des groupes parsés."""
+    root, ok = build_core(md_path, groups)
+    return prettify(root), ok
+
+def process_md(md_path, out_dir, groups=None):
+    if groups is None:
+        groups = parse_md(md_path)
+    xml, ok = render_core(md_path, groups)
     xml_name = md_path.with_suffix('.xml').name
     (out_dir / xml_name).write_text(xml, encoding='utf-8')
     return xml_name, ok
 
-def main():
+def render_doc(md_path):
+    """
+    Parse et rend une doc (exécuté dans un worker) : (octets, ok, ports), où
+    ports est le core_port_maps du XML, transmis tel quel à genSystems.
+    """
+    root, ok = build_core(md_path, parse_md(md_path))
+    # Mêmes octets que write_text() (fins de ligne de la plateforme)
+    xml_bytes = prettify(root).replace('\n', os.linesep).encode('utf-8')
+    return xml_bytes, ok, core_port_maps(root)
+
+def convert_docs(jobs=1, force=False):
+    """
+    Convertit libreto/*.md → retroarch/*.xml. Retourne (nombre d'échecs, cores)
+    avec cores = {core: (octets XML, core_port_maps)} pour les docs régénérées.
+    """
     base    = Path('libreto')     # dossier source des .md
     out_dir = Path('retroarch')   # dossier cible pour les .xml
     out_dir.mkdir(exist_ok=True)
 
     mds   = sorted(base.glob('*.md'))
     total = len(mds)
+    output_for = lambda name: str(out_dir / Path(name).with_suffix('.xml'))
+
+    # Seules les docs dont le contenu a changé sont reparsées et réécrites
+    manifest = Manifest('retroarch', GENERATOR_VERSION, force)
+    digests = {md.name: digest(GENERATOR_VERSION, file_bytes(md)) for md in mds}
+    todo = [md for md in mds if not manifest.is_fresh(md.name, digests[md.name], output_for(md.name))]
+
+    results = {md: (data, err) for md, data, err in map_roms(todo, render_doc, jobs=jobs)}
+    writer = OutputWriter()
+    failures = []
+    cores = {}
     for idx, md in enumerate(mds, 1):
-        xml_name, ok = process_md(md, out_dir)
-        status = 'OK' if ok else 'EMPTY'
+        xml_name = md.with_suffix('.xml').name
+        if md in results:
+            data, err = results[md]
+            if data is None:
+                failures.append((md.name, None, err))
+                print(f"[{idx}/{total}] {md.name} → {xml_name} [ERROR]")
+                continue
+            xml_bytes, ok, ports = data
+            status = 'OK' if ok else 'EMPTY'
+            writer.write(output_for(md.name), xml_bytes)
+            cores[md.stem] = (xml_bytes, ports)
+            manifest.record(md.name, digests[md.name], status)
+        else:
+            status = manifest.meta.get(md.name, 'OK')
         print(f"[{idx}/{total}] {md.name} → {xml_name} [{status}]")
+    manifest.prune([md.name for md in mds], output_for, writer)
+    manifest.save()
+
+    print(f"\nProcessed {total} MD files ({len(todo)} re-parsed), generated {total} XML files in {out_dir.resolve()}")
+    writer.report(str(out_dir))
+    return report_failures(failures, 'retroarch'), cores
 
-    print(f"\nProcessed {total} MD files, generated {total} XML files in {out_dir.resolve()}")
+def main(jobs=1, force=False):
+    return convert_docs(jobs, force)[0]
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Convertit les docs libretro (libreto/*.md) en retroarch/*.xml')
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    args = parser.parse_args()
+    sys.exit(1 if main(args.jobs, args.force) else 0)
@@ -1,7 +1,16 @@
 import os
-import configparser
+import sys
+import argparse
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
+
+from buildManifest import Manifest, add_force_argument, digest, file_bytes
+from iniIndex import IniIndex, load_ini_index
+from layoutModel import Button, GameLayout, Layout, game_xml, to_element
+from outputWriter import OutputWriter
+from palette import intern_ini, report_unknown, table
+from retroarchCore import core_port_maps
+from romPool import add_jobs_argument
+from xmlWriter import pretty_xml
 
 # ————————————————————————————————————————————
 # Config file and output directory
@@ -9,6 +18,9 @@ SYSTEMS_INI   = 'goldo-systems-colors.ini'
 RETROARCH_DIR = 'retroarch'
 OUTPUT_DIR    = 'systems'
 
+# À incrémenter dès que la logique de génération change (invalide le manifest)
+GENERATOR_VERSION = 1
+
 MACHINE_TO_EMUS = {
     '3do':            ['opera', '4do'],
     '3ds':            ['citra', 'citra2018'],
@@ -254,84 +266,79 @@ GROUP_MAPPING = {
     'mastersystem': 'MS Joypad 2 Button',
 }
 
+# Valeur INI → Color partagé, dialecte goldo
+_COLORS = table('goldo')
+
 def normalize_color(c: str) -> str:
-    """Mappe DarkGreen→Green, Green→Lime, sinon passe la chaîne telle quelle."""
-    if not c: return 'Gray'
-    c0 = c.strip().lower()
-    if c0 == 'darkgreen': return 'Green'
-    if c0 == 'green':     return 'Lime'
-    return c
+    """Mappe DarkGreen→Green, Green→Lime, vide→Gray (dialecte goldo de la palette commune)."""
+    return _COLORS[c].name
 
 def prettify_xml(elem: ET.Element) -> bytes:
-    rough = ET.tostring(elem, 'utf-8')
-    parsed = minidom.parseString(rough)
-    return parsed.toprettyxml(indent="  ", encoding="utf-8")
-
-def load_system_colors(path: str) -> configparser.ConfigParser:
-    cfg = configparser.ConfigParser()
-    cfg.optionxform = str
-    cfg.read(path)
+    return pretty_xml(elem, indent="  ", encoding="utf-8")
+
+def load_system_colors(path: str) -> IniIndex:
+    cfg = load_ini_index(path)
+    report_unknown(intern_ini(cfg, 'goldo'), path)
     return cfg
 
-def find_emulator_xml(system: str):
-    """Retourne le premier fichier <core>.xml existant pour la machine."""
-    from glob import glob
+def find_emulator_xml(system: str, cores=None):
+    """Retourne le premier fichier <core>.xml existant (ou déjà en mémoire) pour la machine."""
     for core in MACHINE_TO_EMUS.get(system, []):
         p = os.path.join(RETROARCH_DIR, f'{core}.xml')
-        if os.path.isfile(p):
+        if (cores and core in cores) or os.path.isfile(p):
             return p
     return None
 
-def select_group(root: ET.Element, system: str) -> ET.Element:
-    """Choisit le <group> correspondant au panel (ou le premier)."""
-    groups = root.findall('.//group')
+def select_group(groups: list, system: str):
+    """Choisit le groupe (nom, ports) correspondant au panel (ou le premier)."""
     target = GROUP_MAPPING.get(system.lower())
     if target:
         for g in groups:
-            if g.get('name') == target:
+            if g[0] == target:
                 return g
     return groups[0] if groups else None
 
-def parse_emulator(path: str, system: str) -> dict:
+# Cores déjà parsés depuis le disque : {chemin: ((taille, mtime), groupes)}
+_CORE_CACHE = {}
+
+def load_core(path: str) -> list:
+    """core_port_maps du fichier `path`, parsé une seule fois tant qu'il ne change pas."""
+    st = os.stat(path)
+    key = (st.st_size, st.st_mtime_ns)
+    hit = _CORE_CACHE.get(path)
+    if hit is None or hit[0] != key:
+        hit = _CORE_CACHE[path] = (key, core_port_maps(ET.parse(path).getroot()))
+    return hit[1]
+
+def core_groups(path: str, cores=None) -> list:
+    """Groupes du core `path` : transmis en mémoire par genRetroarch, sinon lus sur disque."""
+    core = os.path.splitext(os.path.basename(path))[0]
+    if cores and core in cores:
+        return cores[core][1]
+    return load_core(path)
+
+def parse_emulator(path: str, system: str, cores=None) -> dict:
     """
     Parse un core RetroArch, cherche le bon <group>, et construit
     port_map_by_retropad = { retropad_id: {'system_entry', 'value'} }
     """
-    tree = ET.parse(path)
-    root = tree.getroot()
-    grp = select_group(root, system)
-    m = {}
-    if grp is None:
-        return m
-    for port in grp.findall('port'):
-        ns = port.find('newseq')
-        if ns is None: continue
-        rid = ns.get('retropad_id')
-        if rid is None: continue
-        i = int(rid)
-        m[i] = {
-            'system_entry': ns.get('system_entry'),
-            'value':        (ns.text or '').strip()
-        }
-    return m
-
-def generate_system_xml(system: str, colors: configparser.ConfigParser) -> ET.Element:
+    grp = select_group(core_groups(path, cores), system)
+    return dict(grp[1]) if grp is not None else {}
+
+def system_layout(system: str, colors: IniIndex, cores=None) -> GameLayout:
     sys_lc = system.lower()
-    xml_in = find_emulator_xml(sys_lc)
-    port_map = parse_emulator(xml_in, sys_lc) if xml_in else {}
+    xml_in = find_emulator_xml(sys_lc, cores)
+    port_map = parse_emulator(xml_in, sys_lc, cores) if xml_in else {}
 
-    root    = ET.Element('system', name=system)
-    layouts = ET.SubElement(root, 'layouts')
+    sys_colors = colors.section(system) or {}
 
     # couleur du joystick
-    joy_col = normalize_color(colors[system].get('P1_JOYSTICK','White'))
+    joy_col = normalize_color(sys_colors.get('P1_JOYSTICK','White'))
+    layouts = []
 
     for panel, rid_list in PANEL_RETROPAD_IDS.items():
         n = len(rid_list)
-        lay = ET.SubElement(layouts, 'layout',
-                            panelButtons=str(n),
-                            type=panel)
-        ET.SubElement(lay, 'joystick', color=joy_col)
+        buttons = []
 
         # — boutons de jeu —
         for idx, rid in enumerate(rid_list, start=1):
@@ -343,62 +350,101 @@ def generate_system_xml(system: str, colors: configparser.ConfigParser) -> ET.El
             info = port_map.get(rid, {})
             game_btn = info.get('system_entry') or 'NONE'
             func     = info.get('value')        or 'None'
-            col      = normalize_color(colors[system].get(f'P1_BUTTON{phys}','Gray'))
-
-            ET.SubElement(lay, 'button',
-                          id=str(idx),
-                          physical=phys,
-                          controller=ctrl,
-                          retropad_id=str(rid),
-                          gameButton=game_btn,
-                          function=func,
-                          x=str(x), y=str(y),
-                          color=col)
+            col      = normalize_color(sys_colors.get(f'P1_BUTTON{phys}','Gray'))
+            buttons.append(Button(str(idx), phys, ctrl, game_btn, x, y, col, func, retropad_id=rid))
 
         # — START —
         s_inf = port_map.get(3, {})
         s_game = s_inf.get('system_entry') or 'START'
         s_func = s_inf.get('value')        or 'Start'
-        s_col  = normalize_color(colors[system].get('P1_START','White'))
-        ET.SubElement(lay, 'button',
-                      id='START',
-                      physical=str(n+1),
-                      controller='START',
-                      retropad_id='3',
-                      gameButton=s_game,
-                      function=s_func,
-                      x=str(START_POS[0]), y=str(START_POS[1]),
-                      color=s_col)
+        s_col  = normalize_color(sys_colors.get('P1_START','White'))
+        buttons.append(Button('START', str(n+1), 'START', s_game,
+                              START_POS[0], START_POS[1], s_col, s_func, retropad_id=3))
 
         # — COIN (Select) —
         c_inf = port_map.get(2, {})
         c_game = c_inf.get('system_entry') or 'COIN'
         c_func = c_inf.get('value')        or 'Coin'
-        c_col  = normalize_color(colors[system].get('P1_COIN','White'))
-        ET.SubElement(lay, 'button',
-                      id='COIN',
-                      physical=str(n+2),
-                      controller='SELECT',
-                      retropad_id='2',
-                      gameButton=c_game,
-                      function=c_func,
-                      x=str(COIN_POS[0]), y=str(COIN_POS[1]),
-                      color=c_col)
-
-    return root
-
-def main():
+        c_col  = normalize_color(sys_colors.get('P1_COIN','White'))
+        buttons.append(Button('COIN', str(n+2), 'SELECT', c_game,
+                              COIN_POS[0], COIN_POS[1], c_col, c_func, retropad_id=2))
+
+        layouts.append(Layout(panel, n, joy_col, buttons))
+
+    return GameLayout(system, layouts)
+
+def generate_system_xml(system: str, colors: IniIndex, cores=None) -> ET.Element:
+    return to_element(system_layout(system, colors, cores))
+
+def core_bytes(path: str, cores=None):
+    core = os.path.splitext(os.path.basename(path))[0] if path else None
+    if cores and core in cores:
+        return cores[core][0]
+    return file_bytes(path)
+
+def system_digest(system: str, colors: IniIndex, cores=None) -> str:
+    """Empreinte des entrées d'un système : section couleurs + XML du core."""
+    xml_in = find_emulator_xml(system.lower(), cores)
+    return digest(GENERATOR_VERSION, system, colors.section(system),
+                  xml_in, core_bytes(xml_in, cores))
+
+def output_path(system: str) -> str:
+    return os.path.join(OUTPUT_DIR, f'{system}.xml')
+
+def main(force=False, cores=None):
+    """
+    `cores` : {core: (octets XML, core_port_maps)} transmis par genRetroarch
+    dans le mode pipeline ; les autres cores sont lus (une fois) sur disque.
+    """
     cfg = load_system_colors(SYSTEMS_INI)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest = Manifest('systems', GENERATOR_VERSION, force)
+    writer = OutputWriter()
+    systems = cfg.names()
+    fresh = 0
 
-    for system in cfg.sections():
+    for system in systems:
+        dig = system_digest(system, cfg, cores)
+        if manifest.is_fresh(system, dig, output_path(system)):
+            fresh += 1
+            continue
         print(f"… Génération {system} …")
-        xml_root = generate_system_xml(system, cfg)
-        xml_bytes = prettify_xml(xml_root)
-        with open(os.path.join(OUTPUT_DIR, f'{system}.xml'), 'wb') as f:
-            f.write(xml_bytes)
+        xml_bytes = game_xml(system_layout(system, cfg, cores))
+        writer.write(output_path(system), xml_bytes)
+        manifest.record(system, dig)
 
+    manifest.prune(systems, output_path, writer)
+    manifest.save()
+    print(f"{len(systems) - fresh} régénéré(s), {fresh} à jour")
+    writer.report(OUTPUT_DIR)
     print("Terminé.")
 
+def pipeline(jobs=1, force=False) -> int:
+    """genRetroarch puis genSystems dans le même processus, cores passés en mémoire."""
+    import genRetroarch
+    failures, cores = genRetroarch.convert_docs(jobs, force)
+    main(force, cores)
+    return failures
+
 if __name__ == '__main__':
-    main()
+    # Sorties optionnelles : importées ici pour ne pas alourdir le chemin de lancement (launchGen)
+    from layoutBundle import add_bundle_argument, pack_dir
+    from layoutDb import add_db_argument, update_db
+    from ledFrames import add_leds_argument, pack_dir as pack_leds
+    parser = argparse.ArgumentParser(description='Génère les XML systems/<system>.xml')
+    add_force_argument(parser)
+    parser.add_argument('--from-docs', action='store_true',
+                        help='convertit d\'abord libreto/*.md (genRetroarch) dans le même processus')
+    add_jobs_argument(parser)
+    add_bundle_argument(parser)
+    add_db_argument(parser)
+    add_leds_argument(parser)
+    args = parser.parse_args()
+    failed = pipeline(args.jobs, args.force) if args.from_docs else main(args.force)
+    if args.bundle:
+        print(f'Bundle : {pack_dir(OUTPUT_DIR)}')
+    if args.leds:
+        print(f'LED : {pack_leds(OUTPUT_DIR)}')
+    if args.db:
+        print(update_db('systems', OUTPUT_DIR, args.db))
+    sys.exit(1 if failed else 0)
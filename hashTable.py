@@ -0,0 +1,107 @@
+import mmap
+import hashlib
+
+# ————————————————————————————————————————————
+# Table d'entrées struct triées par hash du nom en minuscules (premier champ),
+# commune aux fichiers binaires projetés en mémoire : index de sources
+# (sourceIndex), bundles de layouts (layoutBundle) et trames LED (ledFrames).
+# Une recherche = une dichotomie sur les hash puis une vérification du nom.
+
+
+def name_hash(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.lower().encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HashTable:
+    """`count` entrées `entry` (struct) triées par hash, à partir de `offset` dans `blob` (mmap ou octets)."""
+
+    def __init__(self, blob, offset, count, entry):
+        self._blob = blob
+        self._offset = offset
+        self._count = count
+        self._entry = entry
+
+    def __len__(self) -> int:
+        return self._count
+
+    def entry(self, i):
+        return self._entry.unpack_from(self._blob, self._offset + i * self._entry.size)
+
+    def candidates(self, name):
+        """Entrées dont le hash est celui de `name`, dans l'ordre de la table."""
+        h = name_hash(name)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entry(mid)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._count:
+            entry = self.entry(lo)
+            if entry[0] != h:
+                break
+            yield entry
+            lo += 1
+
+    def matching(self, name, name_of):
+        """Comme candidates, en écartant les entrées dont le nom (`name_of(entry)`) diffère."""
+        key = name.lower()
+        # Vérifie le nom (collision de hash improbable mais possible)
+        return (entry for entry in self.candidates(name) if name_of(entry).lower() == key)
+
+    def find(self, name, name_of):
+        return next(self.matching(name, name_of), None)
+
+
+class MappedTable:
+    """
+    Lecteur d'un fichier projeté en mémoire : en-tête HEADER (MAGIC en premier
+    champ), table HashTable d'entrées ENTRY finissant par (offset, longueur) du
+    nom, puis les noms UTF-8 concaténés.
+    """
+    MAGIC = b''
+    HEADER = ENTRY = None
+    WHAT = 'un fichier indexé'
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = self.HEADER.unpack_from(self._map, 0)
+        if fields[0] != self.MAGIC:
+            self._map.close()
+            raise ValueError(f'{path} : pas {self.WHAT}')
+        count, offset = self._read_header(fields)
+        self._table = HashTable(self._map, offset, count, self.ENTRY)
+        self._names = offset + count * self.ENTRY.size
+
+    def _read_header(self, fields):
+        """(nombre d'entrées, offset de la table) d'après les champs de l'en-tête."""
+        raise NotImplementedError
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, name) -> bool:
+        return self._find(name) is not None
+
+    def _name(self, entry) -> str:
+        start = self._names + entry[-2]
+        return self._map[start:start + entry[-1]].decode('utf-8')
+
+    def names(self) -> list:
+        """Noms des entrées, triés."""
+        return sorted(self._name(self._table.entry(i)) for i in range(len(self._table)))
+
+    def _find(self, name):
+        return self._table.find(name, self._name)
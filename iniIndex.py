@@ -0,0 +1,337 @@
+import io
+import os
+import re
+import sys
+import hashlib
+import argparse
+
+from inputSnapshot import load_cached
+from sourceIndex import spans_of
+
+# ————————————————————————————————————————————
+# Index partagé des fichiers INI (couleurs / contrôles LEDSpicer, LEDBlinky, goldo).
+# Chaque jeu de fichiers est lu une seule fois par exécution, en une passe,
+# puis toutes les recherches de section se font en O(1) via une clé en minuscules.
+#
+# Règles de priorité (identiques à l'ancien configparser.read(COLOR_INIS)) :
+#   - les fichiers sont lus dans l'ordre de la liste ;
+#   - une section présente dans plusieurs fichiers est fusionnée option par option ;
+#   - pour une même option, le DERNIER fichier de la liste l'emporte ;
+#   - dans un même fichier, une section ou option en double est une erreur si
+#     strict=True, sinon la dernière occurrence l'emporte (strict=False).
+# Chaque valeur écrasée par un fichier suivant est consignée dans `conflicts`.
+
+_CACHE = {}
+_FILE_CACHE = {}
+_COMMENT_PREFIXES = ('#', ';')
+
+# À incrémenter si les règles de parsing changent (invalide les snapshots)
+PARSER_VERSION = 1
+
+
+class IniConflict:
+    """Option définie avec des valeurs différentes dans deux fichiers."""
+    __slots__ = ('section', 'option', 'old_value', 'old_file', 'new_value', 'new_file')
+
+    def __init__(self, section, option, old_value, old_file, new_value, new_file):
+        self.section = section
+        self.option = option
+        self.old_value = old_value
+        self.old_file = old_file
+        self.new_value = new_value
+        self.new_file = new_file
+
+    def __str__(self):
+        return (f'[{self.section}] {self.option}: {self.old_value!r} ({self.old_file}) '
+                f'→ {self.new_value!r} ({self.new_file})')
+
+
+def _split_option(line):
+    # Premier '=' ou ':' (comme OPTCRE de configparser)
+    eq, colon = line.find('='), line.find(':')
+    if eq < 0 or (0 <= colon < eq):
+        eq = colon
+    if eq <= 0:
+        return None, None
+    return line[:eq].rstrip(), line[eq + 1:].strip()
+
+
+def parse_ini_file(path, sections, origins, conflicts, strict=True):
+    """
+    Lit `path` en une passe et fusionne ses sections dans `sections`
+    ({section: {option: valeur}}). `origins` mémorise le fichier d'origine
+    de chaque option pour les diagnostics de fusion.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        parse_ini_lines(f, path, sections, origins, conflicts, strict)
+
+
+def parse_ini_lines(lines, path, sections, origins, conflicts, strict=True):
+    """Comme parse_ini_file, sur des lignes déjà lues (fichier entier ou extrait)."""
+    intern = sys.intern
+    name = os.path.basename(path)
+    seen_here = set()
+    opts = None
+    section = None
+    option = None
+    for lineno, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line or line.startswith(_COMMENT_PREFIXES):
+            continue
+        # Ligne de continuation d'une valeur multi-lignes
+        if option is not None and raw[0] in ' \t':
+            opts[option] = f'{opts[option]}\n{line}'
+            continue
+        if line[0] == '[' and line.rfind(']') > 1:
+            section = line[1:line.rindex(']')]
+            if section in seen_here and strict:
+                raise ValueError(f'{path}:{lineno}: section [{section}] en double')
+            seen_here.add(section)
+            opts = sections.get(section)
+            if opts is None:
+                opts = sections[section] = {}
+            option = None
+            continue
+        if opts is None:
+            raise ValueError(f'{path}:{lineno}: option hors section : {line!r}')
+        key, value = _split_option(line)
+        if key is None:
+            raise ValueError(f'{path}:{lineno}: ligne INI invalide : {line!r}')
+        key = intern(key)
+        origin_key = (section, key)
+        previous = origins.get(origin_key)
+        if previous == name:
+            if strict:
+                raise ValueError(f'{path}:{lineno}: option {key} en double dans [{section}]')
+        elif previous is not None and opts[key] != value:
+            conflicts.append(IniConflict(section, key, opts[key], previous, value, name))
+        opts[key] = intern(value)
+        origins[origin_key] = name
+        option = key
+
+
+class IniIndex:
+    """Index minuscules → section, avec un dict d'options par section."""
+
+    def __init__(self, sections: dict, conflicts=()):
+        defaults = sections.pop('DEFAULT', None)
+        self._names = []
+        self._by_key = {}
+        self.conflicts = list(conflicts)
+        for section, opts in sections.items():
+            key = section.lower()
+            if key in self._by_key:
+                # Comme l'ancien parcours linéaire : la première section gagne
+                continue
+            self._names.append(section)
+            self._by_key[key] = {**defaults, **opts} if defaults else opts
+
+    @classmethod
+    def from_configparser(cls, cfg):
+        return cls({s: dict(cfg.items(s, raw=True)) for s in cfg.sections()})
+
+    def names(self) -> list:
+        """Noms de sections d'origine, dans l'ordre des fichiers."""
+        return list(self._names)
+
+    def __contains__(self, name) -> bool:
+        return name is not None and name.lower() in self._by_key
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def section(self, name) -> dict:
+        """Options de la section `name` (insensible à la casse), ou None."""
+        if name is None:
+            return None
+        return self._by_key.get(name.lower())
+
+    def get(self, name, option, fallback=None):
+        opts = self.section(name)
+        if opts is None:
+            return fallback
+        return opts.get(option, fallback)
+
+
+def load_ini_file(path, strict=True) -> dict:
+    """
+    Sections {section: {option: valeur}} d'un seul fichier, lu une fois par
+    exécution tant qu'il ne change pas : un fichier commun à plusieurs jeux
+    (ledspicer / ledblinky pour MAME et FBNeo) n'est parsé qu'une fois.
+    Le résultat est partagé : ne pas le modifier.
+    """
+    stamp = _stamp(path)
+    hit = _FILE_CACHE.get((path, strict))
+    if hit is None or hit[0] != stamp:
+        with open(path, 'rb') as f:
+            data = f.read()
+        sections = texts = None
+        if hit is not None:
+            # Fichier déjà lu par ce processus : seules les sections modifiées sont reparsées
+            sections, texts = _reparse_changed(path, strict, hit, data)
+        if sections is None:
+            sections = {}
+            parse_ini_lines(_text_lines(data), path, sections, {}, [], strict)
+        hit = _FILE_CACHE[(path, strict)] = (stamp, sections, data, texts)
+    return hit[1]
+
+
+def _text_lines(data: bytes):
+    # Mêmes lignes que open(path, encoding='utf-8') (fins de ligne universelles)
+    return io.StringIO(data.decode('utf-8'), newline=None)
+
+
+_INDENTED_HEADER = re.compile(rb'^[ \t]+\[', re.M)
+_LONE_CR = re.compile(rb'\r(?!\n)')
+
+
+def _section_texts(data: bytes):
+    """
+    (texte avant la 1re section, {nom minuscule: octets de ses sections}),
+    ou None si le découpage par en-têtes n'est pas fiable (en-têtes indentés,
+    fins de ligne \\r seules).
+    """
+    if _INDENTED_HEADER.search(data) or _LONE_CR.search(data):
+        return None
+    spans = spans_of(data, 'ini')
+    first = min((off for occ in spans.values() for off, _ in occ), default=len(data))
+    return data[:first], {name: b''.join(data[off:off + length] for off, length in occ)
+                          for name, occ in spans.items()}
+
+
+def _reparse_changed(path, strict, hit, data):
+    """
+    Sections de `data` en ne reparsant que celles dont le texte a changé depuis
+    le parsing en cache `hit`. Retourne (sections, textes), avec sections=None
+    quand seul un parsing complet est sûr (découpage non fiable, variantes de
+    casse d'une même section, erreur à situer dans le fichier).
+    """
+    _, old_sections, old_data, old = hit
+    old = old or _section_texts(old_data)
+    new = _section_texts(data)
+    if old is None or new is None or new[0] != old[0]:
+        return None, new
+    old_texts, texts = old[1], new[1]
+    old_names = {}
+    for section in old_sections:
+        if old_names.setdefault(section.strip().lower(), section) != section:
+            return None, new
+    sections = {}
+    for key, text in texts.items():
+        if old_texts.get(key) == text and key in old_names:
+            sections[old_names[key]] = old_sections[old_names[key]]
+            continue
+        parsed = {}
+        try:
+            parse_ini_lines(_text_lines(text), path, parsed, {}, [], strict)
+        except ValueError:
+            return None, new
+        if len(parsed) != 1:
+            return None, new
+        sections.update(parsed)
+    return sections, new
+
+
+def merge_sections(files) -> IniIndex:
+    """Fusionne [(chemin, sections)] dans l'ordre de priorité (le dernier l'emporte)."""
+    sections, origins, conflicts = {}, {}, []
+    owned = set()
+    for path, file_sections in files:
+        name = os.path.basename(path)
+        for section, opts in file_sections.items():
+            merged = sections.get(section)
+            if merged is None:
+                # Partagé avec le cache tant qu'aucun autre fichier n'y touche
+                sections[section] = opts
+                for key in opts:
+                    origins[(section, key)] = name
+                continue
+            if section not in owned:
+                merged = sections[section] = dict(merged)
+                owned.add(section)
+            for key, value in opts.items():
+                previous = origins.get((section, key))
+                if previous is not None and merged[key] != value:
+                    conflicts.append(IniConflict(section, key, merged[key], previous, value, name))
+                merged[key] = value
+                origins[(section, key)] = name
+    return IniIndex(sections, conflicts)
+
+
+def parse_ini(paths, strict=True) -> IniIndex:
+    """Lit les INI `paths` (fichiers absents ignorés) et construit leur index."""
+    return merge_sections([(path, load_ini_file(path, strict))
+                           for path in paths if os.path.isfile(path)])
+
+
+def parse_ini_chunks(chunks, strict=True) -> IniIndex:
+    """
+    Index construit à partir d'extraits de fichiers : [(chemin, texte), ...],
+    dans l'ordre de priorité des fichiers (utilisé pour les sections isolées).
+    """
+    sections, origins, conflicts = {}, {}, []
+    for path, text in chunks:
+        parse_ini_lines(text.splitlines(), path, sections, origins, conflicts, strict)
+    return IniIndex(sections, conflicts)
+
+
+def load_ini_index(paths, strict=True) -> IniIndex:
+    """Charge (une fois par exécution) les INI `paths` et retourne leur index."""
+    if isinstance(paths, str):
+        paths = [paths]
+    key = (tuple(paths), strict)
+    stamps = tuple(_stamp(p) for p in paths)
+    hit = _CACHE.get(key)
+    if hit is None or hit[0] != stamps:
+        # Premier chargement, ou un fichier a changé (processus longs : build --watch)
+        tag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+        hit = _CACHE[key] = (stamps, load_cached(f'ini-{tag}', paths,
+                                                 lambda: parse_ini(paths, strict), PARSER_VERSION))
+    return hit[1]
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def cached_file_sections(path):
+    """Dernières sections parsées de `path` dans ce processus (None si jamais lu)."""
+    for (p, _), (_, sections, _, _) in _FILE_CACHE.items():
+        if p == path:
+            return sections
+    return None
+
+
+def changed_sections(old, new) -> list:
+    """Noms des sections ajoutées, supprimées ou modifiées entre deux parsings d'un fichier."""
+    old, new = old or {}, new or {}
+    return [name for name in dict.fromkeys([*old, *new]) if old.get(name) != new.get(name)]
+
+
+def report_conflicts(index: IniIndex, details=False):
+    """Résumé des valeurs écrasées lors de la fusion, par couple de fichiers."""
+    by_pair = {}
+    for c in index.conflicts:
+        by_pair.setdefault((c.old_file, c.new_file), []).append(c)
+    if not by_pair:
+        print('Aucun conflit de fusion.')
+    for (old, new), items in by_pair.items():
+        print(f'{new} écrase {old} : {len(items)} valeur(s) '
+              f'dans {len({c.section for c in items})} section(s)')
+        if details:
+            for c in items:
+                print(f'  {c}')
+    return len(index.conflicts)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Diagnostics de fusion des INI (dans l\'ordre de priorité)')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--details', action='store_true', help='liste chaque valeur écrasée')
+    parser.add_argument('--loose', action='store_true', help='tolère les doublons dans un même fichier')
+    args = parser.parse_args()
+    report_conflicts(parse_ini(args.files, strict=not args.loose), args.details)
@@ -0,0 +1,121 @@
+import os
+import pickle
+import hashlib
+
+from buildManifest import CACHE_DIR
+
+# ————————————————————————————————————————————
+# Snapshot binaire des entrées déjà parsées (YAML, INI, docs Markdown).
+# Le résultat du parsing est sérialisé (pickle) dans .cache/<nom>.snapshot avec,
+# pour chaque fichier source, sa taille, son mtime et son empreinte SHA-1.
+# Au chargement suivant, si les sources n'ont pas changé le snapshot est relu
+# en quelques millisecondes ; sinon il est reconstruit de façon transparente.
+# Mettre ES_PANELS_NO_SNAPSHOT=1 dans l'environnement pour tout reparser.
+
+SNAPSHOT_FORMAT = 1
+
+
+def enabled() -> bool:
+    return os.environ.get('ES_PANELS_NO_SNAPSHOT', '') in ('', '0')
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _stamp(path, previous=None):
+    """(taille, mtime_ns, sha1) ; l'empreinte n'est recalculée que si besoin."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+        return previous
+    return (st.st_size, st.st_mtime_ns, _sha1(path))
+
+
+def _same(old, new) -> bool:
+    # Même contenu, même si le mtime a bougé (checkout, copie…)
+    if old is None or new is None:
+        return old is new
+    return old[0] == new[0] and old[2] == new[2]
+
+
+def _snapshot_path(name):
+    return os.path.join(CACHE_DIR, f'{name}.snapshot')
+
+
+def _read(name, version):
+    try:
+        with open(_snapshot_path(name), 'rb') as f:
+            blob = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+        return None
+    if blob.get('format') != SNAPSHOT_FORMAT or blob.get('version') != version:
+        return None
+    return blob
+
+
+def _write(name, version, entries):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _snapshot_path(name)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump({'format': SNAPSHOT_FORMAT, 'version': version, 'entries': entries},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_cached(name, sources, build, version=1, with_hit=False):
+    """
+    Retourne build() pour l'ensemble de fichiers `sources`, via le snapshot `name`.
+    Le snapshot est invalidé dès qu'une source change de contenu. Avec
+    `with_hit`, retourne (données, True si relues depuis le snapshot).
+    """
+    data, hit = _load_cached(name, list(sources), build, version)
+    return (data, hit) if with_hit else data
+
+
+def _load_cached(name, sources, build, version):
+    if not enabled():
+        return build(), False
+    blob = _read(name, version)
+    old = blob['entries'] if blob else {}
+    if old.get('sources') is not None and list(old['sources']) == sources:
+        stamps = {p: _stamp(p, old['sources'][p]) for p in sources}
+        if all(_same(old['sources'][p], stamps[p]) for p in sources):
+            if stamps != old['sources']:
+                _write(name, version, {'sources': stamps, 'data': old['data']})
+            return old['data'], True
+    data = build()
+    _write(name, version, {'sources': {p: _stamp(p) for p in sources}, 'data': data})
+    return data, False
+
+
+def load_cached_per_file(name, paths, parse_one, version=1):
+    """
+    Comme load_cached, mais avec une entrée par fichier : seuls les fichiers
+    modifiés sont reparsés. Retourne {chemin: parse_one(chemin)}.
+    """
+    paths = list(paths)
+    if not enabled():
+        return {p: parse_one(p) for p in paths}
+    blob = _read(name, version)
+    old = blob['entries'] if blob else {}
+    entries, changed = {}, False
+    for p in paths:
+        prev = old.get(p)
+        stamp = _stamp(p, prev[0] if prev else None)
+        if prev and _same(prev[0], stamp):
+            entries[p] = (stamp, prev[1])
+            changed |= stamp != prev[0]
+        else:
+            entries[p] = (stamp, parse_one(p))
+            changed = True
+    if changed or set(old) != set(entries):
+        _write(name, version, entries)
+    return {p: data for p, (_, data) in entries.items()}
@@ -0,0 +1,109 @@
+"""
+Génération à la demande du layout d'un seul jeu, au lancement (hook ES).
+
+    generate('mame', 'sf2')    → octets de mame/sf2.xml
+    generate('fbneo', 'sf2')   → octets de fbneo/sf2.xml
+    generate('snes', rom)      → octets de systems/snes.xml (layout par système)
+
+Contrairement aux scripts batch, rien n'est chargé en entier : seules la ou
+les sections INI de la ROM et son entrée fbneo.yml sont lues (sourceIndex).
+Le résultat est identique, octet pour octet, au fichier produit en batch.
+
+Usage : python launchGen.py SYSTEME ROM [-o FICHIER] [--time]
+"""
+import sys
+import time
+import argparse
+
+from iniIndex import parse_ini_chunks
+from layoutModel import game_xml
+from sourceIndex import read_ini_section, read_yaml_entry
+
+ARCADE_ALIASES = {'mame': 'mame', 'arcade': 'mame', 'fbneo': 'fbneo'}
+
+
+def load_sections(paths, name, strict=True):
+    """IniIndex limité à la section `name`, fusionnée sur `paths` dans l'ordre."""
+    return parse_ini_chunks([(p, read_ini_section(p, name)) for p in paths], strict)
+
+
+def generate_mame(rom):
+    import genMame
+    rom_key = rom.lower()
+    is_neo = rom_key in genMame.NEOGEO_ROMS
+    section = 'neogeo' if is_neo else rom_key
+    func_cfg = load_sections([genMame.CONTROLS_INI], section, strict=False)
+    # Même ensemble de ROMs que le batch (genMame.list_roms)
+    if not is_neo and (rom_key == 'neogeo' or section not in func_cfg):
+        return None
+    color_cfg = load_sections(genMame.COLOR_INIS, section)
+    return game_xml(genMame.game_layout_for_rom(rom_key, color_cfg, func_cfg))
+
+
+def generate_fbneo(rom):
+    import genFbNeo
+    rom_key = rom.lower()
+    text = read_yaml_entry(genFbNeo.CONTROLS_YAML, rom_key)
+    if text is None:
+        return None
+    entry = genFbNeo._load_yaml(text) or {}
+    controls = {str(k).lower(): v for k, v in entry.items()}
+    color_cfg = load_sections(genFbNeo.COLOR_INIS, rom_key)
+    game = genFbNeo.game_layout_for_rom(rom_key, color_cfg, controls)
+    return game_xml(game) if game is not None else None
+
+
+def generate_system(system):
+    import genSystems
+    colors = load_sections([genSystems.SYSTEMS_INI], system.lower())
+    if not len(colors):
+        return None
+    name = colors.names()[0]
+    return game_xml(genSystems.system_layout(name, colors))
+
+
+def preload(system, rom=None):
+    """Importe à l'avance le générateur concerné (hors latence de génération)."""
+    kind = ARCADE_ALIASES.get(system.lower()) if rom else None
+    __import__({'mame': 'genMame', 'fbneo': 'genFbNeo'}.get(kind, 'genSystems'))
+
+
+def generate(system, rom=None):
+    """Layout XML (octets) de `rom` pour `system`, ou None si inconnu."""
+    kind = ARCADE_ALIASES.get(system.lower()) if rom else None
+    if kind == 'mame':
+        return generate_mame(rom)
+    if kind == 'fbneo':
+        return generate_fbneo(rom)
+    return generate_system(system)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Génère le layout XML d\'un seul jeu')
+    parser.add_argument('system', help='mame, fbneo ou nom de système RetroBat')
+    parser.add_argument('rom', nargs='?', help='nom de la ROM (mame / fbneo)')
+    parser.add_argument('-o', '--output', help='fichier de sortie (défaut : stdout)')
+    parser.add_argument('--time', action='store_true', help='affiche la latence sur stderr')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    preload(args.system, args.rom)
+    t1 = time.perf_counter()
+    xml_bytes = generate(args.system, args.rom)
+    t2 = time.perf_counter()
+    if args.time:
+        print(f'{args.system}/{args.rom}: import {(t1 - t0) * 1000:.2f} ms, '
+              f'génération {(t2 - t1) * 1000:.2f} ms', file=sys.stderr)
+    if xml_bytes is None:
+        print(f'Aucun layout pour {args.system}/{args.rom}', file=sys.stderr)
+        return 1
+    if args.output:
+        from outputWriter import OutputWriter
+        OutputWriter().write(args.output, xml_bytes)
+    else:
+        sys.stdout.buffer.write(xml_bytes)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
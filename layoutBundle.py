@@ -0,0 +1,130 @@
+import os
+import sys
+import struct
+import argparse
+
+from hashTable import MappedTable, name_hash
+from outputWriter import OutputWriter
+
+# ————————————————————————————————————————————
+# Bundle de layouts : tous les XML d'un dossier de sortie (mame/, fbneo/,
+# systems/) dans un seul fichier indexé <dossier>.bundle, pour les cabinets
+# où ouvrir des milliers de petits fichiers est lent (FAT/exFAT, partage
+# réseau). Format :
+#   en-tête   magic, nombre d'entrées, offset de la table
+#   données   les XML bout à bout, dans l'ordre des noms
+#   table     (hash du nom en minuscules, offset, longueur, nom) triée par hash
+#   noms      noms UTF-8 concaténés
+# La lecture d'un layout = une dichotomie dans la table projetée en mémoire
+# (mmap) puis une copie de l'extrait : aucun autre fichier n'est ouvert.
+
+BUNDLE_MAGIC = b'ESPBNDL\x01'
+BUNDLE_SUFFIX = '.bundle'
+_HEADER = struct.Struct('<8sI4xQ')
+_ENTRY = struct.Struct('<QQIII')
+
+
+def bundle_path(output_dir) -> str:
+    return os.path.normpath(output_dir) + BUNDLE_SUFFIX
+
+
+def pack_bytes(items) -> bytes:
+    """Contenu d'un bundle pour [(nom, octets XML)] (noms uniques, insensibles à la casse)."""
+    items = sorted(items, key=lambda item: item[0])
+    data, entries, names = [], [], []
+    offset, name_offset = _HEADER.size, 0
+    for name, xml_bytes in items:
+        raw_name = name.encode('utf-8')
+        entries.append((name_hash(name), offset, len(xml_bytes), name_offset, len(raw_name)))
+        data.append(xml_bytes)
+        names.append(raw_name)
+        offset += len(xml_bytes)
+        name_offset += len(raw_name)
+    entries.sort()
+    header = _HEADER.pack(BUNDLE_MAGIC, len(entries), offset)
+    return b''.join([header, *data, *(_ENTRY.pack(*e) for e in entries), *names])
+
+
+def read_dir(output_dir):
+    """[(nom, octets)] des <nom>.xml de `output_dir`."""
+    items = []
+    for entry in sorted(os.scandir(output_dir), key=lambda e: e.name):
+        if entry.is_file() and entry.name.endswith('.xml'):
+            with open(entry.path, 'rb') as f:
+                items.append((entry.name[:-4], f.read()))
+    return items
+
+
+def pack_dir(output_dir, path=None, writer=None) -> str:
+    """Écrit (si le contenu a changé) le bundle de `output_dir` ; retourne son chemin."""
+    path = path or bundle_path(output_dir)
+    (writer or OutputWriter()).write(path, pack_bytes(read_dir(output_dir)))
+    return path
+
+
+class LayoutBundle(MappedTable):
+    """Lecteur d'un bundle : get(nom) → octets du XML, ou None."""
+    MAGIC = BUNDLE_MAGIC
+    HEADER = _HEADER
+    ENTRY = _ENTRY
+    WHAT = 'un bundle de layouts'
+
+    def _read_header(self, fields):
+        return fields[1], fields[2]
+
+    def get(self, name):
+        entry = self._find(name)
+        if entry is None:
+            return None
+        return self._map[entry[1]:entry[1] + entry[2]]
+
+
+def expand(path, output_dir) -> OutputWriter:
+    """Recrée les <nom>.xml d'un bundle dans `output_dir` (fichiers identiques non réécrits)."""
+    os.makedirs(output_dir, exist_ok=True)
+    writer = OutputWriter()
+    with LayoutBundle(path) as bundle:
+        for name in bundle.names():
+            writer.write(os.path.join(output_dir, f'{name}.xml'), bundle.get(name))
+    return writer
+
+
+def add_bundle_argument(parser):
+    parser.add_argument('--bundle', action='store_true',
+                        help='écrit aussi le bundle indexé <dossier>.bundle de tous les layouts')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bundles de layouts (un fichier indexé par dossier de sortie)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('pack', help='crée <dossier>.bundle depuis un dossier de XML')
+    p.add_argument('directory')
+    p.add_argument('-o', '--output', help='chemin du bundle (défaut : <dossier>.bundle)')
+    p = sub.add_parser('expand', help='recrée les XML individuels depuis un bundle')
+    p.add_argument('bundle')
+    p.add_argument('-o', '--output', help='dossier cible (défaut : nom du bundle sans .bundle)')
+    p = sub.add_parser('get', help='affiche le layout d\'une ROM / d\'un système')
+    p.add_argument('bundle')
+    p.add_argument('name')
+    p = sub.add_parser('list', help='liste les layouts d\'un bundle')
+    p.add_argument('bundle')
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        writer = OutputWriter()
+        path = pack_dir(args.directory, args.output, writer)
+        with LayoutBundle(path) as bundle:
+            print(f'{path} : {len(bundle)} layout(s), {os.path.getsize(path)} octets')
+    elif args.command == 'expand':
+        out = args.output or os.path.splitext(args.bundle)[0]
+        expand(args.bundle, out).report(out)
+    elif args.command == 'get':
+        with LayoutBundle(args.bundle) as bundle:
+            xml_bytes = bundle.get(args.name)
+        if xml_bytes is None:
+            sys.exit(f'{args.name} absent de {args.bundle}')
+        sys.stdout.buffer.write(xml_bytes)
+    else:
+        with LayoutBundle(args.bundle) as bundle:
+            for name in bundle.names():
+                print(name)
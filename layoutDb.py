@@ -0,0 +1,301 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import argparse
+
+from layoutModel import button_slots, parse_xml
+
+# ————————————————————————————————————————————
+# Base SQLite des layouts générés, pour les contrôleurs LED et les thèmes :
+# « layout de la ROM X sur un panel 6 boutons » ou « tous les jeux avec un
+# bouton 3 rouge » en une requête indexée, sans parser de XML.
+#
+#   systems  (id, name)                         — systèmes RetroBat + 'arcade'
+#   games    (id, source, rom, name, system_id)  — une ligne par XML mame/fbneo
+#   layouts  (id, game_id | system_id, panel_type, panel_buttons, joystick_color)
+#   buttons  (layout_id, position, button_id, physical, slot, controller,
+#             game_button, retropad_id, color, function, x, y)
+#   files    (source, name, sha1)               — XML déjà importés
+#
+# Dans buttons, ni button_id (rang 1..n dans fbneo/ et systems/, bouton
+# physique dans mame/) ni physical (START / COIN y valent n+1 / n+2, et le
+# 2-Button de genMame garde le physique d'origine de ses deux boutons) ne
+# désignent à coup sûr une case du panel. slot est la case 1..n, calculée
+# comme pour les trames LED (layoutModel.button_slots), NULL pour START /
+# COIN : c'est elle que filtrent les requêtes par bouton.
+#
+# La base est mise à jour par dossier de sortie (mame, fbneo, systems) :
+# seuls les XML dont le contenu a changé sont réimportés.
+
+DB_PATH = 'layouts.db'
+SCHEMA_VERSION = 3
+SOURCES = ('mame', 'fbneo', 'systems')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS systems (
+    id    INTEGER PRIMARY KEY,
+    name  TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    id         INTEGER PRIMARY KEY,
+    source     TEXT NOT NULL,
+    rom        TEXT NOT NULL,
+    name       TEXT,
+    system_id  INTEGER NOT NULL REFERENCES systems(id),
+    UNIQUE (source, rom)
+);
+CREATE TABLE IF NOT EXISTS layouts (
+    id              INTEGER PRIMARY KEY,
+    source          TEXT NOT NULL,
+    game_id         INTEGER REFERENCES games(id) ON DELETE CASCADE,
+    system_id       INTEGER REFERENCES systems(id),
+    panel_type      TEXT NOT NULL,
+    panel_buttons   INTEGER,
+    joystick_color  TEXT
+);
+CREATE TABLE IF NOT EXISTS buttons (
+    layout_id    INTEGER NOT NULL REFERENCES layouts(id) ON DELETE CASCADE,
+    position     INTEGER NOT NULL,
+    button_id    TEXT NOT NULL,
+    physical     INTEGER,
+    slot         INTEGER,
+    controller   TEXT,
+    game_button  TEXT,
+    retropad_id  INTEGER,
+    color        TEXT,
+    function     TEXT,
+    x            INTEGER,
+    y            INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    source  TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    sha1    TEXT NOT NULL,
+    PRIMARY KEY (source, name)
+);
+CREATE INDEX IF NOT EXISTS games_rom ON games (rom COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS layouts_game ON layouts (game_id, panel_type);
+CREATE INDEX IF NOT EXISTS layouts_system ON layouts (system_id, panel_type);
+CREATE INDEX IF NOT EXISTS buttons_layout ON buttons (layout_id, position);
+CREATE INDEX IF NOT EXISTS buttons_color ON buttons (color, slot);
+'''
+
+
+def panel_type(panel) -> str:
+    """6, '6' ou '6-Button' → '6-Button'."""
+    panel = str(panel)
+    return panel if panel.endswith('-Button') else f'{panel}-Button'
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def connect(path=DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.row_factory = sqlite3.Row
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version != SCHEMA_VERSION:
+        # Schéma différent : la base n'est qu'un cache des XML, on la recrée
+        conn.executescript('DROP TABLE IF EXISTS buttons; DROP TABLE IF EXISTS layouts; '
+                           'DROP TABLE IF EXISTS games; DROP TABLE IF EXISTS systems; '
+                           'DROP TABLE IF EXISTS files;')
+        conn.executescript(SCHEMA)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.commit()
+    return conn
+
+
+def _system_id(conn, name) -> int:
+    conn.execute('INSERT OR IGNORE INTO systems (name) VALUES (?)', (name,))
+    return conn.execute('SELECT id FROM systems WHERE name = ?', (name,)).fetchone()[0]
+
+
+def _insert_layouts(conn, source, layouts, game_id, system_id):
+    for lay in layouts:
+        cur = conn.execute(
+            'INSERT INTO layouts (source, game_id, system_id, panel_type, panel_buttons, joystick_color) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (source, game_id, system_id, lay.type, _int(lay.panel_buttons), lay.joystick_color))
+        slots = {id(b): _int(slot) for slot, b in button_slots(lay) if b.id not in ('START', 'COIN')}
+        conn.executemany(
+            'INSERT INTO buttons (layout_id, position, button_id, physical, slot, controller, game_button, '
+            'retropad_id, color, function, x, y) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(cur.lastrowid, pos, b.id, _int(b.physical), slots.get(id(b)), b.controller, b.game_button,
+              _int(b.retropad_id), b.color, b.function, _int(b.x), _int(b.y))
+             for pos, b in enumerate(lay.buttons)])
+
+
+def _delete(conn, source, name):
+    if source == 'systems':
+        row = conn.execute('SELECT id FROM systems WHERE name = ?', (name,)).fetchone()
+        if row:
+            # Les boutons suivent (ON DELETE CASCADE)
+            conn.execute('DELETE FROM layouts WHERE source = ? AND system_id = ? AND game_id IS NULL',
+                         (source, row[0]))
+    else:
+        conn.execute('DELETE FROM games WHERE source = ? AND rom = ?', (source, name))
+    conn.execute('DELETE FROM files WHERE source = ? AND name = ?', (source, name))
+
+
+def import_game(conn, source, name, game):
+    """(Ré)importe le modèle `game` (layoutModel.GameLayout) sous `name`, sans l'empreinte du fichier."""
+    _delete(conn, source, name)
+    system_id = _system_id(conn, game.system or name)
+    game_id = None
+    if game.rom is not None:
+        cur = conn.execute('INSERT INTO games (source, rom, name, system_id) VALUES (?, ?, ?, ?)',
+                           (source, game.rom or name, game.name, system_id))
+        game_id = cur.lastrowid
+    _insert_layouts(conn, source, game.layouts, game_id, system_id)
+
+
+def import_xml(conn, source, name, xml_bytes):
+    """(Ré)importe le XML `name` de `source` ; l'appelant gère la transaction."""
+    import_game(conn, source, name, parse_xml(xml_bytes))
+    conn.execute('INSERT INTO files (source, name, sha1) VALUES (?, ?, ?)',
+                 (source, name, hashlib.sha1(xml_bytes).hexdigest()))
+
+
+def update_from_dir(source, output_dir, path=DB_PATH):
+    """Synchronise la base avec `output_dir` ; retourne (importés, inchangés, supprimés)."""
+    conn = connect(path)
+    try:
+        known = dict(conn.execute('SELECT name, sha1 FROM files WHERE source = ?', (source,)))
+        seen, imported = set(), 0
+        with conn:
+            for entry in sorted(os.scandir(output_dir), key=lambda e: e.name):
+                if not (entry.is_file() and entry.name.endswith('.xml')):
+                    continue
+                name = entry.name[:-4]
+                seen.add(name)
+                with open(entry.path, 'rb') as f:
+                    xml_bytes = f.read()
+                if known.get(name) == hashlib.sha1(xml_bytes).hexdigest():
+                    continue
+                import_xml(conn, source, name, xml_bytes)
+                imported += 1
+            removed = sorted(set(known) - seen)
+            for name in removed:
+                _delete(conn, source, name)
+        return imported, len(seen) - imported, len(removed)
+    finally:
+        conn.close()
+
+
+def update_db(source, output_dir, path=DB_PATH) -> str:
+    imported, unchanged, removed = update_from_dir(source, output_dir, path)
+    return (f'{path} [{source}] : {imported} importé(s), {unchanged} inchangé(s), '
+            f'{removed} supprimé(s)')
+
+
+class LayoutDb:
+    """Requêtes indexées sur la base des layouts."""
+
+    def __init__(self, path=DB_PATH):
+        self.conn = connect(path)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _layout(self, row):
+        if row is None:
+            return None
+        buttons = self.conn.execute(
+            'SELECT button_id, physical, controller, game_button, retropad_id, color, function, x, y '
+            'FROM buttons WHERE layout_id = ? ORDER BY position', (row['id'],)).fetchall()
+        return {'type': row['panel_type'], 'panelButtons': row['panel_buttons'],
+                'joystick': row['joystick_color'], 'buttons': [dict(b) for b in buttons]}
+
+    def game_layout(self, rom, panel, source=None):
+        """Layout de `rom` pour un panel (6 ou '6-Button'), mame avant fbneo sauf `source`."""
+        sql = ('SELECT layouts.* FROM games JOIN layouts ON layouts.game_id = games.id '
+               'WHERE games.rom = ? COLLATE NOCASE AND layouts.panel_type = ?')
+        args = [rom, panel_type(panel)]
+        if source:
+            sql += ' AND games.source = ?'
+            args.append(source)
+        sql += ' ORDER BY games.source = \'fbneo\' LIMIT 1'
+        return self._layout(self.conn.execute(sql, args).fetchone())
+
+    def system_layout(self, system, panel):
+        """Layout par système (systems/<system>.xml) pour un panel."""
+        row = self.conn.execute(
+            'SELECT layouts.* FROM systems JOIN layouts ON layouts.system_id = systems.id '
+            'WHERE systems.name = ? AND layouts.game_id IS NULL AND layouts.panel_type = ? LIMIT 1',
+            (system, panel_type(panel))).fetchone()
+        return self._layout(row)
+
+    def games_with_button(self, color, slot=None, panel=None, source=None) -> list:
+        """
+        [(source, rom)] des jeux dont le bouton de la case `slot` du panel (tout
+        bouton de jeu si None) est de couleur `color`. START et COIN n'en font pas partie.
+        """
+        sql = ('SELECT DISTINCT games.source, games.rom FROM buttons '
+               'JOIN layouts ON layouts.id = buttons.layout_id '
+               'JOIN games ON games.id = layouts.game_id WHERE buttons.color = ?')
+        args = [color]
+        if slot is None:
+            sql += ' AND buttons.slot IS NOT NULL'
+        else:
+            sql += ' AND buttons.slot = ?'
+            args.append(int(slot))
+        if source is not None:
+            sql += ' AND games.source = ?'
+            args.append(source)
+        if panel is not None:
+            sql += ' AND layouts.panel_type = ?'
+            args.append(panel_type(panel))
+        return [tuple(r) for r in self.conn.execute(sql + ' ORDER BY games.source, games.rom', args)]
+
+
+def add_db_argument(parser):
+    parser.add_argument('--db', nargs='?', const=DB_PATH, metavar='FICHIER',
+                        help=f'met aussi à jour la base SQLite des layouts (défaut : {DB_PATH})')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Base SQLite des layouts (import et requêtes)')
+    parser.add_argument('--db', default=DB_PATH, help=f'fichier de la base (défaut : {DB_PATH})')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('update', help='importe les XML modifiés de mame/, fbneo/ et systems/')
+    p.add_argument('sources', nargs='*', default=list(SOURCES))
+    p = sub.add_parser('layout', help='layout d\'une ROM (ou d\'un système avec --system)')
+    p.add_argument('name')
+    p.add_argument('panel', help='2, 4, 6 ou 8')
+    p.add_argument('--source', choices=['mame', 'fbneo'])
+    p.add_argument('--system', action='store_true')
+    p = sub.add_parser('color', help='jeux ayant un bouton d\'une couleur donnée')
+    p.add_argument('color')
+    p.add_argument('button', nargs='?', type=int, help='case du bouton sur le panel (1 à N)')
+    p.add_argument('--panel')
+    p.add_argument('--source', choices=['mame', 'fbneo'])
+    args = parser.parse_args()
+
+    if args.command == 'update':
+        for source in args.sources:
+            print(update_db(source, source, args.db))
+        sys.exit(0)
+    with LayoutDb(args.db) as db:
+        if args.command == 'layout':
+            lay = (db.system_layout(args.name, args.panel) if args.system
+                   else db.game_layout(args.name, args.panel, args.source))
+            if lay is None:
+                sys.exit(f'Aucun layout {panel_type(args.panel)} pour {args.name}')
+            print(f"{lay['type']} (joystick {lay['joystick']})")
+            for b in lay['buttons']:
+                print(f"  {b['button_id']:>5}  {b['controller'] or '':<9} {b['color'] or '':<8} {b['function'] or ''}")
+        else:
+            for source, rom in db.games_with_button(args.color, args.button, args.panel, args.source):
+                print(f'{source}\t{rom}')
@@ -0,0 +1,196 @@
+import json
+import argparse
+import xml.etree.ElementTree as ET
+
+from xmlWriter import _escape
+
+# ————————————————————————————————————————————
+# Modèle commun des layouts produits par genMame, genFbNeo et genSystems :
+#   GameLayout  un document (système, et ROM pour mame / fbneo)
+#   Layout      un panel (2-, 4-, 6- ou 8-Button) : joystick + boutons
+#   Button      un bouton du panel
+# Les générateurs remplissent ce modèle ; les sérialiseurs ci-dessous (XML,
+# dict / JSON) et layoutDb (SQLite) le consomment. Objets à __slots__, sans
+# __dict__ : un Button pèse quelques dizaines d'octets et les Layout identiques
+# (ROMs de même signature) sont partagés entre plusieurs GameLayout.
+
+
+class Button:
+    """Bouton d'un panel ; retropad_id n'est renseigné que pour les layouts par système."""
+    __slots__ = ('id', 'physical', 'controller', 'game_button', 'x', 'y', 'color', 'function', 'retropad_id')
+
+    def __init__(self, id, physical, controller, game_button, x, y, color, function, retropad_id=None):
+        self.id = id
+        self.physical = physical
+        self.controller = controller
+        self.game_button = game_button
+        self.x = x
+        self.y = y
+        self.color = color
+        self.function = function
+        self.retropad_id = retropad_id
+
+    def attrs(self) -> list:
+        """Attributs XML, dans l'ordre des fichiers existants (systems/ ou mame, fbneo)."""
+        if self.retropad_id is not None:
+            return [('id', self.id), ('physical', self.physical), ('controller', self.controller),
+                    ('retropad_id', str(self.retropad_id)), ('gameButton', self.game_button),
+                    ('function', self.function), ('x', str(self.x)), ('y', str(self.y)),
+                    ('color', self.color)]
+        return [('id', self.id), ('physical', self.physical), ('controller', self.controller),
+                ('gameButton', self.game_button), ('x', str(self.x)), ('y', str(self.y)),
+                ('color', self.color), ('function', self.function)]
+
+    def to_dict(self) -> dict:
+        return dict(self.attrs())
+
+
+class Layout:
+    """Un panel : type ('6-Button'), nombre de boutons, couleur du joystick, boutons."""
+    __slots__ = ('type', 'panel_buttons', 'joystick_color', 'buttons')
+
+    def __init__(self, type, panel_buttons, joystick_color, buttons=()):
+        self.type = type
+        self.panel_buttons = panel_buttons
+        self.joystick_color = joystick_color
+        self.buttons = list(buttons)
+
+    def to_dict(self) -> dict:
+        return {'type': self.type, 'panelButtons': self.panel_buttons,
+                'joystick': self.joystick_color, 'buttons': [b.to_dict() for b in self.buttons]}
+
+
+class GameLayout:
+    """Document complet : <system name> et, si `rom`, <game name rom> ; `layouts` : [Layout]."""
+    __slots__ = ('system', 'rom', 'name', 'layouts')
+
+    def __init__(self, system, layouts, rom=None, name=None):
+        self.system = system
+        self.layouts = layouts
+        self.rom = rom
+        self.name = name if name is not None else rom
+
+    def to_dict(self) -> dict:
+        data = {'system': self.system}
+        if self.rom is not None:
+            data.update(rom=self.rom, name=self.name)
+        data['layouts'] = [lay.to_dict() for lay in self.layouts]
+        return data
+
+
+def button_slots(layout) -> list:
+    """
+    [(emplacement, bouton)] d'un layout. L'emplacement est le bouton physique,
+    sauf quand le layout a renuméroté ses boutons (2-Button de genMame : les
+    deux fonctions retenues gardent leur physique d'origine mais occupent les
+    cases 1 et 2) : l'id donne alors la case.
+    """
+    game = [b for b in layout.buttons if b.id not in ('START', 'COIN')]
+    in_panel = all(b.physical.isdigit() and 1 <= int(b.physical) <= layout.panel_buttons for b in game)
+    slots = [(b.physical if in_panel else b.id, b) for b in game]
+    slots += [(b.id, b) for b in layout.buttons if b.id in ('START', 'COIN')]
+    return slots
+
+
+# ——— XML ———
+
+def to_element(game: GameLayout) -> ET.Element:
+    """Arbre ElementTree du document (mêmes nœuds que les anciens générateurs)."""
+    root = ET.Element('system', name=game.system)
+    parent = root
+    if game.rom is not None:
+        parent = ET.SubElement(root, 'game', name=game.name, rom=game.rom)
+    layouts_el = ET.SubElement(parent, 'layouts')
+    for lay in game.layouts:
+        lay_el = ET.SubElement(layouts_el, 'layout', panelButtons=str(lay.panel_buttons), type=lay.type)
+        ET.SubElement(lay_el, 'joystick', color=lay.joystick_color)
+        for b in lay.buttons:
+            ET.SubElement(lay_el, 'button', dict(b.attrs()))
+    return root
+
+
+def _tag(name, attrs) -> str:
+    return name + ''.join(f' {k}="{_escape(v)}"' for k, v in attrs)
+
+
+def layouts_xml(layouts, depth=1, indent='  ', newl='\n') -> str:
+    """Bloc <layouts> indenté, tel qu'il apparaît à la profondeur `depth` du document."""
+    pad = indent * depth
+    if not layouts:
+        return f'{pad}<layouts/>{newl}'
+    inner, leaf = pad + indent, pad + indent * 2
+    parts = [f'{pad}<layouts>{newl}']
+    for lay in layouts:
+        parts.append(f'{inner}<{_tag("layout", [("panelButtons", str(lay.panel_buttons)), ("type", lay.type)])}>{newl}')
+        parts.append(f'{leaf}<joystick color="{_escape(lay.joystick_color)}"/>{newl}')
+        for b in lay.buttons:
+            parts.append(f'{leaf}<{_tag("button", b.attrs())}/>{newl}')
+        parts.append(f'{inner}</layout>{newl}')
+    parts.append(f'{pad}</layouts>{newl}')
+    return ''.join(parts)
+
+
+def game_xml(game: GameLayout, layouts_text=None, indent='  ', encoding='utf-8', newl='\n') -> bytes:
+    """
+    Octets du document, identiques à pretty_xml(to_element(game)) mais écrits
+    directement depuis le modèle. `layouts_text` : bloc <layouts> déjà sérialisé
+    (layouts_xml) pour les layouts partagés entre plusieurs documents.
+    """
+    parts = [f'<?xml version="1.0" encoding="{encoding}"?>{newl}',
+             f'<{_tag("system", [("name", game.system)])}>{newl}']
+    depth = 1
+    if game.rom is not None:
+        parts.append(f'{indent}<{_tag("game", [("name", game.name), ("rom", game.rom)])}>{newl}')
+        depth = 2
+    parts.append(layouts_text if layouts_text is not None
+                 else layouts_xml(game.layouts, depth, indent, newl))
+    if game.rom is not None:
+        parts.append(f'{indent}</game>{newl}')
+    parts.append(f'</system>{newl}')
+    return ''.join(parts).encode(encoding, 'xmlcharrefreplace')
+
+
+def _int_or(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def from_element(root: ET.Element) -> GameLayout:
+    """Modèle d'un XML de layouts déjà généré (mame/, fbneo/ ou systems/)."""
+    game_el = root.find('game')
+    parent = game_el if game_el is not None else root
+    layouts = []
+    layouts_el = parent.find('layouts')
+    for lay_el in (layouts_el.findall('layout') if layouts_el is not None else ()):
+        joystick = lay_el.find('joystick')
+        buttons = [Button(b.get('id'), b.get('physical'), b.get('controller'), b.get('gameButton'),
+                          _int_or(b.get('x')), _int_or(b.get('y')), b.get('color'), b.get('function'),
+                          _int_or(b.get('retropad_id')))
+                   for b in lay_el.findall('button')]
+        layouts.append(Layout(lay_el.get('type'), _int_or(lay_el.get('panelButtons')),
+                              joystick.get('color') if joystick is not None else None, buttons))
+    if game_el is not None:
+        return GameLayout(root.get('name'), layouts, game_el.get('rom', ''), game_el.get('name'))
+    return GameLayout(root.get('name'), layouts)
+
+
+def parse_xml(xml_bytes) -> GameLayout:
+    return from_element(ET.fromstring(xml_bytes))
+
+
+# ——— JSON ———
+
+def to_json(game: GameLayout, indent=None) -> str:
+    return json.dumps(game.to_dict(), ensure_ascii=False, indent=indent)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convertit un XML de layouts en JSON')
+    parser.add_argument('xml', help='fichier mame/, fbneo/ ou systems/<nom>.xml')
+    parser.add_argument('--indent', type=int, default=2)
+    args = parser.parse_args()
+    with open(args.xml, 'rb') as f:
+        game = parse_xml(f.read())
+    print(to_json(game, args.indent or None))
@@ -0,0 +1,341 @@
+"""
+Serveur local de layouts pour les frontends et les outils LED.
+
+    python layoutServer.py serve [--socket FICHIER | --tcp [HÔTE:]PORT] [--from-sources] [--interval S]
+    python layoutServer.py query NOM [PANEL] [--source mame|fbneo] [--system]
+
+Au démarrage, tous les layouts de mame/, fbneo/ et systems/ sont chargés en
+mémoire (ou régénérés depuis les INI avec --from-sources) et la réponse JSON
+de chaque (jeu, panel) est précalculée : une requête n'est plus qu'une
+recherche dans un dict. Protocole : une requête JSON par ligne, une réponse
+JSON par ligne, sur une socket Unix (défaut) ou en TCP local.
+
+    {"rom": "sf2", "panel": 6}                → layout mame (sinon fbneo) de sf2
+    {"rom": "sf2", "panel": 6, "source": "fbneo"}
+    {"system": "snes", "panel": 4}            → layout par système
+    {"cmd": "stats"}                           → nombre de layouts, rechargements
+
+Les dossiers (ou les sources) sont scrutés en tâche de fond : un XML modifié
+est rechargé seul, sans interrompre le service.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+import xml.etree.ElementTree as ET
+
+from buildManifest import CACHE_DIR, file_stamps, watched_sources
+from layoutDb import SOURCES, panel_type
+from layoutModel import parse_xml
+
+SOCKET_PATH = os.path.join(CACHE_DIR, 'layouts.sock')
+DEFAULT_PORT = 47800
+ARCADE_SOURCES = ('mame', 'fbneo')
+
+
+def _answer(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def game_answers(source, name, game) -> dict:
+    """{panel: réponse JSON précalculée} d'un GameLayout."""
+    answers = {}
+    for lay in game.layouts:
+        data = {'source': source, 'name': name}
+        if game.rom is not None:
+            data['rom'] = game.rom
+        data.update(lay.to_dict())
+        answers[lay.type] = _answer(data)
+    return answers
+
+
+class LayoutStore:
+    """Réponses précalculées {(source, nom en minuscules): {panel: octets}}."""
+
+    def __init__(self, dirs=None):
+        self.dirs = dirs or {source: source for source in SOURCES}
+        self.entries = {}
+        self.stamps = {}
+        self.reloads = 0
+
+    def _scan(self):
+        found = {}
+        for source, folder in self.dirs.items():
+            if not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                if entry.is_file() and entry.name.endswith('.xml'):
+                    st = entry.stat()
+                    found[(source, entry.name[:-4].lower())] = (entry.path, st.st_size, st.st_mtime_ns)
+        return found
+
+    def refresh(self):
+        """Recharge les XML ajoutés / modifiés, oublie les supprimés ; retourne (chargés, supprimés)."""
+        found = self._scan()
+        loaded = 0
+        for key, stamp in found.items():
+            if self.stamps.get(key) == stamp:
+                continue
+            try:
+                with open(stamp[0], 'rb') as f:
+                    game = parse_xml(f.read())
+            except (OSError, ET.ParseError) as exc:
+                # Fichier en cours d'écriture ou invalide : l'ancien layout reste servi
+                # jusqu'à la prochaine modification
+                print(f'{stamp[0]} : {exc}', file=sys.stderr)
+                self.stamps[key] = stamp
+                continue
+            # Une clé = une affectation : les lecteurs voient l'ancienne ou la nouvelle entrée
+            self.entries[key] = game_answers(key[0], os.path.basename(stamp[0])[:-4], game)
+            self.stamps[key] = stamp
+            loaded += 1
+        removed = [key for key in self.stamps if key not in found]
+        for key in removed:
+            self.entries.pop(key, None)
+            del self.stamps[key]
+        if loaded or removed:
+            self.reloads += 1
+        return loaded, len(removed)
+
+    def lookup(self, source, name, panel):
+        hit = self.entries.get((source, name.lower()))
+        return hit.get(panel) if hit else None
+
+    def answer(self, line: bytes) -> bytes:
+        try:
+            req = json.loads(line)
+            if req.get('cmd') == 'stats':
+                return _answer({'layouts': len(self.entries), 'reloads': self.reloads})
+            panel = panel_type(req.get('panel', 8))
+            if 'system' in req:
+                hit = self.lookup('systems', req['system'], panel)
+            else:
+                sources = [req['source']] if req.get('source') else ARCADE_SOURCES
+                hit = next((h for s in sources if (h := self.lookup(s, req['rom'], panel))), None)
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            return _answer({'error': f'requête invalide : {type(exc).__name__}: {exc}'})
+        return hit or _answer({'error': 'layout introuvable'})
+
+
+class SourceStore(LayoutStore):
+    """
+    Layouts régénérés en mémoire depuis les INI / fbneo.yml / cores, sans passer
+    par les XML. Quand une source change, seules les entrées dont l'empreinte
+    (rom_digest / system_digest, celles des manifests) a changé sont reconstruites.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.digests = {}
+
+    def _scan(self):
+        return file_stamps(watched_sources(SOURCES))
+
+    def _inputs(self):
+        """{(source, clé): (nom, empreinte, fabrique du GameLayout)} de toutes les entrées."""
+        import genMame, genFbNeo, genSystems
+        inputs = {}
+        color_cfg, func_cfg = genMame.load_configurations()
+        for rom in genMame.list_roms(func_cfg):
+            inputs[('mame', rom)] = (rom, genMame.rom_digest(rom, color_cfg, func_cfg),
+                                     lambda rom=rom: genMame.game_layout_for_rom(rom, color_cfg, func_cfg))
+        fb_colors, controls = genFbNeo.load_color_config(), genFbNeo.load_controls(verbose=False)
+        for rom in controls:
+            inputs[('fbneo', rom)] = (rom, genFbNeo.rom_digest(rom, fb_colors, controls),
+                                      lambda rom=rom: genFbNeo.game_layout_for_rom(rom, fb_colors, controls))
+        colors = genSystems.load_system_colors(genSystems.SYSTEMS_INI)
+        for system in colors.names():
+            inputs[('systems', system.lower())] = (system, genSystems.system_digest(system, colors),
+                                                   lambda system=system: genSystems.system_layout(system, colors))
+        return inputs
+
+    def refresh(self):
+        found = self._scan()
+        if found == self.stamps:
+            return 0, 0
+        inputs = self._inputs()
+        # Copie modifiée puis remplacement en bloc : les requêtes en cours gardent l'ancien dict
+        entries = dict(self.entries)
+        rebuilt = 0
+        for key, (name, dig, build) in inputs.items():
+            if self.digests.get(key) == dig:
+                continue
+            game = build()
+            if game is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = game_answers(key[0], name, game)
+            self.digests[key] = dig
+            rebuilt += 1
+        removed = [key for key in self.digests if key not in inputs]
+        for key in removed:
+            entries.pop(key, None)
+            del self.digests[key]
+        self.entries = entries
+        self.stamps = found
+        if rebuilt or removed:
+            self.reloads += 1
+        return rebuilt, len(removed)
+
+
+# ——— Serveur ———
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(store.answer(line))
+
+
+class _UnixServer(getattr(socketserver, 'ThreadingUnixStreamServer', object)):
+    daemon_threads = True
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def parse_address(tcp=None, path=None):
+    """('unix', chemin) ou ('tcp', (hôte, port)) ; TCP si les sockets Unix manquent."""
+    if tcp is None and path is None and not hasattr(socket, 'AF_UNIX'):
+        tcp = str(DEFAULT_PORT)
+    if tcp is not None:
+        host, _, port = str(tcp).rpartition(':')
+        return 'tcp', (host or '127.0.0.1', int(port))
+    return 'unix', path or SOCKET_PATH
+
+
+def _watch(store, interval, stop):
+    while not stop.wait(interval):
+        try:
+            loaded, removed = store.refresh()
+        except Exception as exc:
+            print(f'Rechargement impossible : {type(exc).__name__}: {exc}', file=sys.stderr)
+            continue
+        if loaded or removed:
+            print(f'{time.strftime("[%H:%M:%S]")} {loaded} layout(s) rechargé(s), {removed} supprimé(s)')
+
+
+def _socket_in_use(path) -> bool:
+    """Vrai si un serveur accepte encore les connexions sur la socket Unix `path`."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def serve(address, from_sources=False, interval=1.0, ready=None) -> int:
+    kind, target = address
+    # Vérifié avant le chargement : une socket restée d'un serveur arrêté est
+    # remplacée, celle d'un serveur actif jamais
+    if kind == 'unix' and os.path.exists(target) and _socket_in_use(target):
+        print(f'Un serveur répond déjà sur {target}', file=sys.stderr)
+        return 1
+    t0 = time.perf_counter()
+    store = SourceStore() if from_sources else LayoutStore()
+    store.refresh()
+    print(f'{len(store.entries)} layouts chargés en {time.perf_counter() - t0:.2f} s')
+    if kind == 'unix':
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        server = _UnixServer(target, _Handler)
+    else:
+        server = _TcpServer(target, _Handler)
+    server.store = store
+    stop = threading.Event()
+    threading.Thread(target=_watch, args=(store, interval, stop), daemon=True).start()
+    print(f'En écoute sur {target if kind == "unix" else "%s:%d" % target} (Ctrl+C pour arrêter)')
+    if ready is not None:
+        ready.set()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('Arrêt du serveur.')
+    finally:
+        stop.set()
+        server.server_close()
+        if kind == 'unix' and os.path.exists(target):
+            os.remove(target)
+    return 0
+
+
+# ——— Client ———
+
+class LayoutClient:
+    """Connexion persistante au serveur : une requête = un aller-retour sur la socket."""
+
+    def __init__(self, address=None):
+        kind, target = address or parse_address()
+        family = socket.AF_UNIX if kind == 'unix' else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(target)
+        if kind == 'tcp':
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile('rb')
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def raw(self, request: dict) -> bytes:
+        self.sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        return self.rfile.readline()
+
+    def request(self, request: dict) -> dict:
+        return json.loads(self.raw(request))
+
+    def layout(self, rom, panel=8, source=None) -> dict:
+        req = {'rom': rom, 'panel': panel}
+        if source:
+            req['source'] = source
+        return self.request(req)
+
+    def system(self, name, panel=8) -> dict:
+        return self.request({'system': name, 'panel': panel})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serveur local de layouts (JSON par ligne)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve', help='charge les layouts et répond aux requêtes')
+    p.add_argument('--from-sources', action='store_true', help='régénère les layouts depuis les INI au lieu des XML')
+    p.add_argument('--interval', type=float, default=1.0, help='période de scrutation en secondes (défaut 1)')
+    p = sub.add_parser('query', help='interroge un serveur en cours')
+    p.add_argument('name', help='ROM ou système (avec --system)')
+    p.add_argument('panel', nargs='?', default='8', choices=['2', '4', '6', '8'])
+    p.add_argument('--source', choices=list(ARCADE_SOURCES))
+    p.add_argument('--system', action='store_true')
+    for p in sub.choices.values():
+        p.add_argument('--socket', metavar='FICHIER', help=f'socket Unix (défaut : {SOCKET_PATH})')
+        p.add_argument('--tcp', metavar='[HÔTE:]PORT', help=f'TCP local au lieu de la socket Unix (ex. {DEFAULT_PORT})')
+    args = parser.parse_args(argv)
+
+    address = parse_address(args.tcp, args.socket)
+    if args.command == 'serve':
+        return serve(address, args.from_sources, args.interval)
+    with LayoutClient(address) as client:
+        answer = (client.system(args.name, args.panel) if args.system
+                  else client.layout(args.name, args.panel, args.source))
+    print(json.dumps(answer, ensure_ascii=False, indent=2))
+    return 1 if 'error' in answer else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import struct
+import argparse
+
+from hashTable import MappedTable, name_hash
+from layoutModel import button_slots, parse_xml
+from layoutBundle import read_dir
+from outputWriter import OutputWriter
+from palette import OFF, rgb
+
+# ————————————————————————————————————————————
+# Trames LED précalculées : pour chaque layout d'un dossier de sortie (mame/,
+# fbneo/, systems/) et chaque panel, les octets RGB prêts à envoyer au
+# contrôleur, dans un seul fichier <dossier>.leds projeté en mémoire.
+# Changer les LED au défilement d'un jeu = une dichotomie + une copie de 33 octets.
+#
+#   en-tête   magic, nombre d'entrées, nombre de couleurs, offsets table / palette
+#   trames    par entrée, 4 panels (2, 4, 6, 8 boutons) × 11 emplacements RGB :
+#             boutons physiques 1 à 8, START, COIN, joystick (éteint = 0,0,0)
+#   table     (hash du nom en minuscules, offset des trames, nom) triée par hash
+#   noms      noms UTF-8 concaténés
+#   palette   (longueur, nom, R, G, B) de chaque couleur rencontrée
+
+LEDS_MAGIC = b'ESPLEDS\x01'
+LEDS_SUFFIX = '.leds'
+PANELS = ('2-Button', '4-Button', '6-Button', '8-Button')
+SLOTS = ('1', '2', '3', '4', '5', '6', '7', '8', 'START', 'COIN', 'JOYSTICK')
+FRAME_SIZE = 3 * len(SLOTS)
+_HEADER = struct.Struct('<8sIIQQ')
+_ENTRY = struct.Struct('<QQII')
+
+
+def leds_path(output_dir) -> str:
+    return os.path.normpath(output_dir) + LEDS_SUFFIX
+
+
+def layout_frame(layout, palette=None) -> bytes:
+    """Trame RGB (FRAME_SIZE octets) d'un layout ; `palette` reçoit {nom: rgb}."""
+    colors = dict.fromkeys(SLOTS, OFF)
+    named = [('JOYSTICK', layout.joystick_color)] + [(slot, b.color) for slot, b in button_slots(layout)]
+    for slot, name in named:
+        if slot in colors:
+            colors[slot] = rgb(name)
+            if palette is not None and name:
+                palette.setdefault(name, colors[slot])
+    return bytes(c for slot in SLOTS for c in colors[slot])
+
+
+def game_frames(game, palette=None) -> bytes:
+    """Trames des 4 panels d'un GameLayout (panel absent → tout éteint)."""
+    by_type = {lay.type: lay for lay in game.layouts}
+    return b''.join(layout_frame(by_type[p], palette) if p in by_type else bytes(FRAME_SIZE)
+                    for p in PANELS)
+
+
+def pack_bytes(items) -> bytes:
+    """Contenu d'un fichier .leds pour [(nom, octets XML)]."""
+    items = sorted(items, key=lambda item: item[0])
+    palette = {}
+    frames, entries, names = [], [], []
+    offset, name_offset = _HEADER.size, 0
+    for name, xml_bytes in items:
+        block = game_frames(parse_xml(xml_bytes), palette)
+        raw_name = name.encode('utf-8')
+        entries.append((name_hash(name), offset, name_offset, len(raw_name)))
+        frames.append(block)
+        names.append(raw_name)
+        offset += len(block)
+        name_offset += len(raw_name)
+    entries.sort()
+    table = offset
+    palette_offset = table + len(entries) * _ENTRY.size + name_offset
+    colors = []
+    for name, color in sorted(palette.items()):
+        raw = name.encode('utf-8')
+        colors.append(bytes([len(raw)]) + raw + bytes(color))
+    header = _HEADER.pack(LEDS_MAGIC, len(entries), len(colors), table, palette_offset)
+    return b''.join([header, *frames, *(_ENTRY.pack(*e) for e in entries), *names, *colors])
+
+
+def pack_dir(output_dir, path=None, writer=None) -> str:
+    """Écrit (si le contenu a changé) le fichier .leds de `output_dir` ; retourne son chemin."""
+    path = path or leds_path(output_dir)
+    (writer or OutputWriter()).write(path, pack_bytes(read_dir(output_dir)))
+    return path
+
+
+class LedFrames(MappedTable):
+    """Lecteur d'un fichier .leds : frame(nom, panel) → octets RGB, ou None."""
+    MAGIC = LEDS_MAGIC
+    HEADER = _HEADER
+    ENTRY = _ENTRY
+    WHAT = 'un fichier de trames LED'
+
+    def _read_header(self, fields):
+        _, count, self._colors, table, self._palette = fields
+        return count, table
+
+    def frame(self, name, panel='8-Button'):
+        """FRAME_SIZE octets RGB (boutons 1-8, START, COIN, joystick) de `name` pour `panel`."""
+        entry = self._find(name)
+        if entry is None:
+            return None
+        start = entry[1] + PANELS.index(panel) * FRAME_SIZE
+        return self._map[start:start + FRAME_SIZE]
+
+    def colors(self, name, panel='8-Button'):
+        """{emplacement: (R, G, B)} de `name` pour `panel`, ou None."""
+        data = self.frame(name, panel)
+        if data is None:
+            return None
+        return {slot: tuple(data[i * 3:i * 3 + 3]) for i, slot in enumerate(SLOTS)}
+
+    def palette(self) -> dict:
+        """{nom de couleur: (R, G, B)} des couleurs présentes dans les layouts."""
+        colors, pos = {}, self._palette
+        for _ in range(self._colors):
+            size = self._map[pos]
+            name = self._map[pos + 1:pos + 1 + size].decode('utf-8')
+            colors[name] = tuple(self._map[pos + 1 + size:pos + 4 + size])
+            pos += 4 + size
+        return colors
+
+
+def add_leds_argument(parser):
+    parser.add_argument('--leds', action='store_true',
+                        help='écrit aussi les trames LED précalculées <dossier>.leds')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Trames LED précalculées (un fichier .leds par dossier de sortie)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('pack', help='crée <dossier>.leds depuis un dossier de XML')
+    p.add_argument('directory')
+    p.add_argument('-o', '--output', help='chemin du fichier (défaut : <dossier>.leds)')
+    p = sub.add_parser('get', help='affiche la trame d\'une ROM / d\'un système')
+    p.add_argument('leds')
+    p.add_argument('name')
+    p.add_argument('panel', nargs='?', default='8', choices=['2', '4', '6', '8'])
+    p.add_argument('--time', action='store_true', help='affiche le temps de recherche')
+    p = sub.add_parser('palette', help='liste les couleurs et leur RGB')
+    p.add_argument('leds')
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        path = pack_dir(args.directory, args.output)
+        with LedFrames(path) as leds:
+            print(f'{path} : {len(leds)} layout(s), {os.path.getsize(path)} octets')
+    elif args.command == 'get':
+        with LedFrames(args.leds) as leds:
+            t0 = time.perf_counter()
+            colors = leds.colors(args.name, f'{args.panel}-Button')
+            elapsed = time.perf_counter() - t0
+        if colors is None:
+            sys.exit(f'{args.name} absent de {args.leds}')
+        for slot, color in colors.items():
+            print(f'{slot:>8}  #{bytes(color).hex()}')
+        if args.time:
+            print(f'recherche : {elapsed * 1e6:.1f} µs', file=sys.stderr)
+    else:
+        with LedFrames(args.leds) as leds:
+            for name, color in leds.palette().items():
+                print(f'{name:<10} #{bytes(color).hex()}')
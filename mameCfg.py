@@ -0,0 +1,414 @@
+"""
+Injection de la configuration MAME au lancement d'un jeu (hook ES).
+
+    python mameCfg.py inject ROM [--panel N] [--inputs FICHIER] [--cfg-dir DOSSIER] [--time]
+    python mameCfg.py restore ROM [--cfg-dir DOSSIER]
+    python mameCfg.py batch DOSSIER_DUMPS [-o DOSSIER] [-j N]
+
+`inject` fusionne le dump des ports MAME <rom>_inputs.cfg avec le layout
+genMame de la ROM pour le panel de la borne : la séquence standard (<newseq>)
+de chaque port P1_BUTTONn / START1 / COIN1 est remplacée par la touche du
+bouton RetroBat qui porte cette fonction sur le panel. Le <rom>.cfg d'origine
+est mis de côté dans <rom>_backup.cfg, et `restore` le remet en place en fin
+de session.
+
+La table port → touche de chaque ROM (pour les quatre panels) n'est calculée
+qu'une fois, depuis les seules sections INI de la ROM, puis gardée dans
+.cache/mamecfg/<rom>.json tant que les INI ne changent pas : au lancement,
+il ne reste qu'à relire cette table et à réécrire le dump en une passe.
+
+`batch` précompile d'avance le .cfg de chaque ROM pour chaque panel, depuis
+un dossier de dumps <rom>_inputs.cfg : avec --prebuilt, `inject` n'a plus
+qu'à recopier le fichier.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+from buildManifest import CACHE_DIR
+from outputWriter import OutputWriter
+from romPool import add_jobs_argument, map_roms, report_failures
+
+MAME_CFG_DIR = os.path.join('bios', 'mame', 'cfg')
+INPUTS_SUFFIX = '_inputs.cfg'
+# .cfg précompilés par `batch` : <PREBUILT_DIR>/<panel>/<rom>.cfg
+PREBUILT_DIR = 'mamecfg'
+TABLE_DIR = os.path.join(CACHE_DIR, 'mamecfg')
+# À incrémenter si le calcul des tables change (invalide le cache)
+TABLE_FORMAT = 2
+
+# Touche MAME de chaque contrôleur RetroBat (tableau « Mapping RetroBat → MAME »
+# du README). COIN garde la touche 5 du clavier, la touche par défaut de MAME :
+# KEYCODE_5PAD est déjà pris par le bouton physique 5.
+CONTROLLER_KEYCODES = {
+    'A': 'KEYCODE_1PAD', 'B': 'KEYCODE_2PAD',
+    'X': 'KEYCODE_3PAD', 'Y': 'KEYCODE_4PAD',
+    'PAGEUP': 'KEYCODE_5PAD', 'PAGEDOWN': 'KEYCODE_6PAD',
+    'L2': 'KEYCODE_7PAD', 'R2': 'KEYCODE_8PAD',
+    'START': 'KEYCODE_9PAD', 'SELECT': 'KEYCODE_5',
+}
+NEO_LETTERS = 'ABCDEFGH'
+
+_PORT = re.compile(r'^([ \t]*)<port\b([^>]*?)(/>|>(.*?)</port>)', re.M | re.S)
+_PORT_TYPE = re.compile(r'\btype="([^"]*)"')
+_STANDARD_SEQ = re.compile(r'(<newseq\s+type="standard"\s*>)(\s*)(.*?)(\s*)(</newseq>)', re.S)
+
+
+# ——— Tables port → touche ———
+
+def panel_type(panel) -> str:
+    """Comme layoutDb.panel_type, sans importer sqlite3 au lancement du jeu."""
+    panel = str(panel)
+    return panel if panel.endswith('-Button') else f'{panel}-Button'
+
+
+def compile_tables(rom, color_cfg, func_cfg) -> dict:
+    """
+    {panel: {type de port MAME: touche}} d'une ROM, d'après ses layouts genMame.
+    Chaque fonction va sur la touche de la case du panel où le layout la place
+    (attribut id : sur un panel 2 boutons, les cases 1 et 2).
+    """
+    import genMame
+    signature = genMame.layout_signature(rom, color_cfg, func_cfg)
+    is_neo, default_panel = signature[:2]
+    order = genMame.BUTTON_PHYS_ORDER[default_panel]
+    tables = {}
+    for lay in genMame.build_layouts(signature):
+        table = {}
+        for b in lay.buttons:
+            if b.id == 'START':
+                table['START1'] = CONTROLLER_KEYCODES[b.controller]
+                continue
+            if b.id == 'COIN':
+                table['COIN1'] = CONTROLLER_KEYCODES[b.controller]
+                continue
+            if b.function == 'None':
+                continue
+            if is_neo:
+                n = NEO_LETTERS.index(b.game_button) + 1
+            else:
+                n = order.index(b.physical) + 1
+            table[f'P1_BUTTON{n}'] = CONTROLLER_KEYCODES[genMame.RB_CONTROLLER_MAP[b.id]]
+        tables[lay.type] = table
+    return tables
+
+
+def _table_path(rom):
+    return os.path.join(TABLE_DIR, f'{rom}.json')
+
+
+def _stamps(paths):
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            stamps.append([path, None, None])
+            continue
+        stamps.append([path, st.st_size, st.st_mtime_ns])
+    return stamps
+
+
+def _read_tables(rom):
+    try:
+        with open(_table_path(rom), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('format') != TABLE_FORMAT:
+        return None
+    if _stamps(path for path, _, _ in data['sources']) != data['sources']:
+        return None
+    return data['panels']
+
+
+def write_tables(rom, tables, sources):
+    os.makedirs(TABLE_DIR, exist_ok=True)
+    path = _table_path(rom)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'format': TABLE_FORMAT, 'sources': _stamps(sources), 'panels': tables},
+                  f, sort_keys=True, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def load_tables(rom):
+    """Tables de `rom` (cache .cache/mamecfg), calculées à la demande ; None si ROM inconnue."""
+    rom = rom.lower()
+    tables = _read_tables(rom)
+    if tables is not None:
+        return tables
+    import genMame
+    from launchGen import load_sections
+    is_neo = rom in genMame.NEOGEO_ROMS
+    section = 'neogeo' if is_neo else rom
+    func_cfg = load_sections([genMame.CONTROLS_INI], section, strict=False)
+    # Même ensemble de ROMs que genMame.list_roms
+    if not is_neo and (rom == 'neogeo' or section not in func_cfg):
+        return None
+    color_cfg = load_sections(genMame.COLOR_INIS, section)
+    tables = compile_tables(rom, color_cfg, func_cfg)
+    try:
+        write_tables(rom, tables, genMame.COLOR_INIS + [genMame.CONTROLS_INI])
+    except OSError:
+        pass
+    return tables
+
+
+# ——— Fusion avec le dump des ports ———
+
+def merge_ports(text: str, table: dict) -> str:
+    """Réécrit en une passe la séquence standard des ports de `table` dans un .cfg MAME."""
+    def port(m):
+        pad, attrs, end, body = m.groups()
+        t = _PORT_TYPE.search(attrs)
+        key = table.get(t.group(1)) if t else None
+        if key is None:
+            return m.group(0)
+        if body is not None:
+            new_body, count = _STANDARD_SEQ.subn(
+                lambda s: f'{s.group(1)}{s.group(2)}{key}{s.group(4)}{s.group(5)}', body, count=1)
+            if count:
+                return f'{pad}<port{attrs}>{new_body}</port>'
+            body = body.rstrip(' \t')
+        else:
+            attrs, body = attrs.rstrip(), '\n'
+        seq = (f'{pad}    <newseq type="standard">\n{pad}        {key}\n'
+               f'{pad}    </newseq>\n{pad}')
+        return f'{pad}<port{attrs}>{body}{seq}</port>'
+    return _PORT.sub(port, text)
+
+
+def inputs_path(rom, cfg_dir=MAME_CFG_DIR) -> str:
+    return os.path.join(cfg_dir, f'{rom}{INPUTS_SUFFIX}')
+
+
+def cfg_path(rom, cfg_dir=MAME_CFG_DIR) -> str:
+    return os.path.join(cfg_dir, f'{rom}.cfg')
+
+
+def backup_path(rom, cfg_dir=MAME_CFG_DIR) -> str:
+    return os.path.join(cfg_dir, f'{rom}_backup.cfg')
+
+
+def _write_atomic(path, data: bytes):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def backup(rom, cfg_dir=MAME_CFG_DIR):
+    """
+    Met de côté le <rom>.cfg d'origine, sauf si une sauvegarde existe déjà
+    (session précédente non restaurée : elle contient le vrai original).
+    Sans .cfg d'origine, la sauvegarde est un fichier vide.
+    """
+    saved = backup_path(rom, cfg_dir)
+    if os.path.exists(saved):
+        return
+    try:
+        os.replace(cfg_path(rom, cfg_dir), saved)
+    except FileNotFoundError:
+        _write_atomic(saved, b'')
+
+
+def restore(rom, cfg_dir=MAME_CFG_DIR) -> bool:
+    """Remet le <rom>.cfg d'origine (ou le supprime s'il n'y en avait pas)."""
+    saved = backup_path(rom, cfg_dir)
+    try:
+        empty = os.path.getsize(saved) == 0
+    except OSError:
+        return False
+    if empty:
+        try:
+            os.remove(cfg_path(rom, cfg_dir))
+        except FileNotFoundError:
+            pass
+        os.remove(saved)
+    else:
+        os.replace(saved, cfg_path(rom, cfg_dir))
+    return True
+
+
+def prebuilt_path(rom, panel, out_dir=PREBUILT_DIR) -> str:
+    return os.path.join(out_dir, panel_type(panel), f'{rom}.cfg')
+
+
+def _prebuilt(rom, panel, inputs, out_dir):
+    """
+    Octets du .cfg précompilé par `batch`, s'il est au moins aussi récent que le
+    dump et que les INI dont il est issu (sources du cache des tables).
+    """
+    path = prebuilt_path(rom, panel, out_dir)
+    try:
+        with open(_table_path(rom), 'r', encoding='utf-8') as f:
+            sources = [source for source, _, _ in json.load(f)['sources']]
+        built = os.stat(path).st_mtime_ns
+        if any(built < os.stat(source).st_mtime_ns for source in [inputs] + sources):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def inject(rom, panel=8, inputs=None, cfg_dir=MAME_CFG_DIR, prebuilt=None) -> str:
+    """
+    Écrit <cfg_dir>/<rom>.cfg pour le panel de la borne ; retourne son chemin
+    (None si ROM inconnue). Avec `prebuilt` (dossier de `batch`), le .cfg
+    précompilé est simplement recopié.
+    """
+    rom = rom.lower()
+    inputs = inputs or inputs_path(rom, cfg_dir)
+    data = _prebuilt(rom, panel, inputs, prebuilt) if prebuilt else None
+    if data is None:
+        tables = load_tables(rom)
+        if tables is None:
+            return None
+        with open(inputs, 'r', encoding='utf-8') as f:
+            data = merge_ports(f.read(), tables[panel_type(panel)]).encode('utf-8')
+    os.makedirs(cfg_dir, exist_ok=True)
+    backup(rom, cfg_dir)
+    path = cfg_path(rom, cfg_dir)
+    _write_atomic(path, data)
+    return path
+
+
+# ——— Précompilation de tout le romset ———
+
+_BATCH_STATE = {}
+
+
+def _init_batch(color_cfg, func_cfg, inputs_dir):
+    _BATCH_STATE.update(color_cfg=color_cfg, func_cfg=func_cfg, inputs_dir=inputs_dir)
+
+
+def port_types(text: str) -> set:
+    """Types des ports déclarés dans un .cfg MAME."""
+    return {t.group(1) for m in _PORT.finditer(text) if (t := _PORT_TYPE.search(m.group(2)))}
+
+
+def build_rom(rom):
+    """(tables, {panel: octets du .cfg}, ports du dump sans layout, ports du layout absents du dump)."""
+    tables = compile_tables(rom, _BATCH_STATE['color_cfg'], _BATCH_STATE['func_cfg'])
+    with open(inputs_path(rom, _BATCH_STATE['inputs_dir']), 'r', encoding='utf-8') as f:
+        text = f.read()
+    cfgs = {panel: merge_ports(text, table).encode('utf-8') for panel, table in tables.items()}
+    dumped = {t for t in port_types(text) if t.startswith('P1_BUTTON') or t in ('START1', 'COIN1')}
+    mapped = set().union(*tables.values())
+    return tables, cfgs, sorted(dumped - mapped), sorted(mapped - dumped)
+
+
+def _sample(names, limit=10) -> str:
+    return ', '.join(names[:limit]) + (', …' if len(names) > limit else '')
+
+
+def batch(inputs_dir, out_dir=PREBUILT_DIR, jobs=1) -> int:
+    """
+    Précompile <out_dir>/<panel>/<rom>.cfg pour chaque <rom>_inputs.cfg de
+    `inputs_dir` ayant un layout mame/<rom>.xml, et remplit le cache des tables.
+    Retourne le nombre d'échecs.
+    """
+    import genMame
+    color_cfg, func_cfg = genMame.load_configurations()
+    dumps = {name[:-len(INPUTS_SUFFIX)].lower() for name in os.listdir(inputs_dir)
+             if name.lower().endswith(INPUTS_SUFFIX)}
+    layouts = {name[:-4].lower() for name in os.listdir(genMame.OUTPUT_DIR) if name.endswith('.xml')}
+    known = set(genMame.list_roms(func_cfg))
+    roms = sorted(dumps & layouts & known)
+
+    results = map_roms(roms, build_rom, _init_batch, (color_cfg, func_cfg, inputs_dir), jobs)
+    writer = OutputWriter()
+    sources = genMame.COLOR_INIS + [genMame.CONTROLS_INI]
+    built = set()
+    port_issues = []
+    for rom, result, err in results:
+        if result is None:
+            continue
+        tables, cfgs, dump_only, layout_only = result
+        for panel, data in cfgs.items():
+            path = prebuilt_path(rom, panel, out_dir)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not writer.write(path, data):
+                # Contenu inchangé : le .cfg reste valable pour les INI actuels (_prebuilt)
+                os.utime(path)
+        write_tables(rom, tables, sources)
+        built.add(rom)
+        if dump_only or layout_only:
+            port_issues.append((rom, dump_only, layout_only))
+    # .cfg précompilés de ROMs qui ne sont plus à construire : seulement dans les
+    # dossiers de panel écrits par batch (out_dir peut contenir d'autres .cfg), et
+    # jamais ceux d'une ROM en échec ce coup-ci (son dernier .cfg valide reste servi)
+    wanted = set(roms)
+    for panel in genMame.PANEL_IDS:
+        folder = os.path.dirname(prebuilt_path('', panel, out_dir))
+        for name in os.listdir(folder) if os.path.isdir(folder) else ():
+            if name.endswith('.cfg') and name[:-4].lower() not in wanted:
+                writer.remove(os.path.join(folder, name))
+
+    print(f'{len(built)} ROM(s) précompilée(s) × {len(genMame.PANEL_IDS)} panels')
+    writer.report(out_dir)
+    no_layout = sorted(dumps - (layouts & known))
+    no_dump = sorted((layouts & known) - dumps)
+    if no_layout:
+        print(f'{len(no_layout)} dump(s) sans layout mame/ : {_sample(no_layout)}')
+    if no_dump:
+        print(f'{len(no_dump)} layout(s) sans {INPUTS_SUFFIX} : {_sample(no_dump)}')
+    for rom, dump_only, layout_only in port_issues:
+        parts = []
+        if dump_only:
+            parts.append(f'ports sans bouton du layout : {", ".join(dump_only)}')
+        if layout_only:
+            parts.append(f'boutons du layout sans port : {", ".join(layout_only)}')
+        print(f'  {rom} — ' + ' ; '.join(parts))
+    return report_failures(results, 'cfg')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Injecte / restaure la configuration MAME d\'un jeu')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('inject', help='écrit <rom>.cfg depuis <rom>_inputs.cfg et le layout de la ROM')
+    p.add_argument('rom')
+    p.add_argument('--panel', default='8', choices=['2', '4', '6', '8'], help='boutons du panel (défaut 8)')
+    p.add_argument('--inputs', help='dump des ports (défaut : <cfg-dir>/<rom>_inputs.cfg)')
+    p.add_argument('--prebuilt', nargs='?', const=PREBUILT_DIR, metavar='DOSSIER',
+                   help=f'recopie le .cfg précompilé par batch s\'il existe (défaut : {PREBUILT_DIR})')
+    p.add_argument('--time', action='store_true', help='affiche la latence sur stderr')
+    p = sub.add_parser('restore', help='remet le <rom>.cfg d\'origine')
+    p.add_argument('rom')
+    for p in sub.choices.values():
+        p.add_argument('--cfg-dir', default=MAME_CFG_DIR, help=f'dossier cfg de MAME (défaut : {MAME_CFG_DIR})')
+    p = sub.add_parser('batch', help='précompile les .cfg de toutes les ROMs pour chaque panel')
+    p.add_argument('inputs_dir', help='dossier des dumps <rom>_inputs.cfg')
+    p.add_argument('-o', '--output', default=PREBUILT_DIR, help=f'dossier de sortie (défaut : {PREBUILT_DIR})')
+    add_jobs_argument(p)
+    args = parser.parse_args(argv)
+
+    if args.command == 'batch':
+        return 1 if batch(args.inputs_dir, args.output, args.jobs) else 0
+
+    if args.command == 'restore':
+        if not restore(args.rom.lower(), args.cfg_dir):
+            print(f'Aucune sauvegarde pour {args.rom}', file=sys.stderr)
+            return 1
+        return 0
+    t0 = time.perf_counter()
+    try:
+        path = inject(args.rom, args.panel, args.inputs, args.cfg_dir, args.prebuilt)
+    except OSError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    if path is None:
+        print(f'Aucun layout MAME pour {args.rom}', file=sys.stderr)
+        return 1
+    if args.time:
+        print(f'{args.rom}: {path} en {(time.perf_counter() - t0) * 1000:.2f} ms', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
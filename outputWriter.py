@@ -0,0 +1,58 @@
+import os
+import hashlib
+
+# ————————————————————————————————————————————
+# Écriture des fichiers générés sans réécriture inutile.
+# Un fichier identique (taille puis empreinte) n'est pas touché : pas d'écriture
+# sur les cartes SD / partages réseau, pas de changement de mtime.
+# Un fichier modifié est écrit de façon atomique (fichier temporaire + rename).
+
+
+def _sha1(data: bytes) -> bytes:
+    return hashlib.sha1(data).digest()
+
+
+class OutputWriter:
+    """Compte les fichiers écrits / inchangés / supprimés pendant un passage."""
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def is_unchanged(self, path, data: bytes) -> bool:
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+            with open(path, 'rb') as f:
+                return _sha1(f.read()) == _sha1(data)
+        except OSError:
+            return False
+
+    def write(self, path, data: bytes) -> bool:
+        """Écrit `data` dans `path` si le contenu diffère ; True si écrit."""
+        if self.is_unchanged(path, data):
+            self.skipped += 1
+            return False
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.written += 1
+        return True
+
+    def remove(self, path) -> bool:
+        if not os.path.isfile(path):
+            return False
+        os.remove(path)
+        self.removed += 1
+        return True
+
+    def report(self, label):
+        print(f'{label} : {self.written} écrit(s), {self.skipped} inchangé(s), '
+              f'{self.removed} supprimé(s)')
@@ -0,0 +1,141 @@
+import sys
+import argparse
+
+# ————————————————————————————————————————————
+# Palette commune : chaque nom de couleur des INI LEDSpicer / LEDBlinky / goldo
+# est résolu une seule fois en un objet Color partagé (nom canonique + RGB),
+# rangé dans la ColorTable du dialecte que les générateurs indexent directement.
+# Les générateurs écrivent Color.name, ledFrames envoie Color.rgb.
+#
+# Un « dialecte » regroupe les conventions propres à un consommateur : dans
+# les layouts par système (genSystems), le vert goldo est affiché en Lime et
+# DarkGreen en Green, et une couleur vide vaut Gray.
+
+PALETTE = {
+    'Black': (0, 0, 0), 'White': (255, 255, 255), 'Gray': (128, 128, 128),
+    'Red': (255, 0, 0), 'Yellow': (255, 255, 0), 'Blue': (0, 0, 255),
+    'Green': (0, 128, 0), 'Lime': (0, 255, 0), 'DarkGreen': (0, 100, 0),
+    'Orange': (255, 165, 0), 'Cyan': (0, 255, 255), 'Magenta': (255, 0, 255),
+    'Pink': (255, 192, 203), 'Brown': (165, 42, 42), 'Violet': (238, 130, 238),
+    'Purple': (128, 0, 128),
+}
+ALIASES = {'grey': 'Gray'}
+DIALECTS = {
+    None: {},
+    'goldo': {'': 'Gray', 'darkgreen': 'Green', 'green': 'Lime'},
+}
+OFF = (0, 0, 0)
+
+
+class Color:
+    """Couleur résolue ; rgb vaut None pour un nom inconnu (name garde alors la valeur brute)."""
+    __slots__ = ('name', 'rgb')
+
+    def __init__(self, name, rgb):
+        self.name = name
+        self.rgb = rgb
+
+    @property
+    def known(self) -> bool:
+        return self.rgb is not None
+
+    def __repr__(self):
+        return f'Color({self.name!r}, {self.rgb})'
+
+
+_CANONICAL = {name.lower(): Color(name, rgb) for name, rgb in PALETTE.items()}
+_CANONICAL.update((alias, _CANONICAL[name.lower()]) for alias, name in ALIASES.items())
+# valeur brute inconnue → Color, partagé par tous les dialectes
+_UNKNOWN = {}
+
+
+def _resolve(raw, dialect) -> Color:
+    key = (raw or '').strip().lower()
+    key = DIALECTS[dialect].get(key, key).lower()
+    color = _CANONICAL.get(key)
+    if color is None:
+        color = _UNKNOWN.setdefault(raw, Color(raw, None))
+    return color
+
+
+class ColorTable(dict):
+    """{valeur brute: Color} d'un dialecte ; une valeur absente est résolue au premier accès."""
+
+    def __init__(self, dialect=None):
+        super().__init__()
+        self.dialect = dialect
+
+    def __missing__(self, raw):
+        color = self[raw] = _resolve(raw, self.dialect)
+        return color
+
+
+# Une table par dialecte, remplie au chargement des INI (intern_ini) puis à la demande
+_TABLES = {dialect: ColorTable(dialect) for dialect in DIALECTS}
+
+
+def table(dialect=None) -> ColorTable:
+    """Table partagée du dialecte : les générateurs l'indexent directement (table[raw].name)."""
+    return _TABLES[dialect]
+
+
+def resolve(raw, dialect=None) -> Color:
+    """Color (objet partagé) de la valeur INI `raw`."""
+    return _TABLES[dialect][raw]
+
+
+def color_name(raw, dialect=None) -> str:
+    return _TABLES[dialect][raw].name
+
+
+def rgb(name) -> tuple:
+    """RGB d'un nom de couleur déjà écrit dans un layout (inconnu → éteint)."""
+    return _TABLES[None][name].rgb or OFF
+
+
+def intern_ini(cfg, dialect=None) -> dict:
+    """
+    Résout d'avance toutes les couleurs d'un IniIndex ; retourne
+    {valeur inconnue: [sections]} pour le rapport.
+    """
+    unknown = {}
+    colors = _TABLES[dialect]
+    for section in cfg.names():
+        for value in cfg.section(section).values():
+            if colors[value].rgb is None:
+                sections = unknown.setdefault(value, [])
+                if not sections or sections[-1] != section:
+                    sections.append(section)
+    return unknown
+
+
+def report_unknown(unknown, label, limit=5) -> int:
+    """Affiche les couleurs inconnues d'intern_ini ; retourne leur nombre."""
+    if unknown:
+        print(f'{len(unknown)} couleur(s) inconnue(s) dans {label} :')
+        for value, sections in sorted(unknown.items(), key=lambda item: -len(item[1])):
+            sample = ', '.join(sections[:limit]) + (', …' if len(sections) > limit else '')
+            print(f'  - {value!r} ×{len(sections)} ({sample})')
+    return len(unknown)
+
+
+if __name__ == '__main__':
+    from iniIndex import load_ini_index
+    parser = argparse.ArgumentParser(description='Rapport des couleurs des INI (palette commune)')
+    parser.add_argument('files', nargs='*', help='INI de couleurs (défaut : ceux de genMame et genSystems)')
+    parser.add_argument('--dialect', choices=[d for d in DIALECTS if d], help='conventions à appliquer')
+    args = parser.parse_args()
+    if args.files:
+        targets = [(path, args.dialect) for path in args.files]
+    else:
+        import genMame, genSystems
+        targets = [(path, None) for path in genMame.COLOR_INIS] + [(genSystems.SYSTEMS_INI, 'goldo')]
+    total = 0
+    for path, dialect in targets:
+        cfg = load_ini_index(path)
+        unknown = intern_ini(cfg, dialect)
+        used = {resolve(v, dialect).name for s in cfg.names() for v in cfg.section(s).values()}
+        print(f'{path}{f" [{dialect}]" if dialect else ""} : {len(cfg)} sections, '
+              f'{len(used)} couleur(s) : {", ".join(sorted(used))}')
+        total += report_unknown(unknown, path)
+    sys.exit(1 if total else 0)
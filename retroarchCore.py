@@ -0,0 +1,26 @@
+import xml.etree.ElementTree as ET
+
+# ————————————————————————————————————————————
+# Lecture des ports d'un core RetroArch (retroarch/<core>.xml) : écrits par
+# genRetroarch, relus par genSystems. Module neutre importé par les deux.
+
+
+def core_port_maps(root: ET.Element) -> list:
+    """
+    Pour chaque <group> d'un core RetroArch, dans l'ordre :
+    (nom, { retropad_id: {'system_entry', 'value'} })
+    """
+    groups = []
+    for grp in root.findall('.//group'):
+        m = {}
+        for port in grp.findall('port'):
+            ns = port.find('newseq')
+            if ns is None: continue
+            rid = ns.get('retropad_id')
+            if rid is None: continue
+            m[int(rid)] = {
+                'system_entry': ns.get('system_entry'),
+                'value':        (ns.text or '').strip()
+            }
+        groups.append((grp.get('name'), m))
+    return groups
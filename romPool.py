@@ -0,0 +1,61 @@
+import os
+
+# ————————————————————————————————————————————
+# Répartition de la génération par ROM sur un pool de processus.
+# Les données lourdes (couleurs, contrôles) sont transmises une seule fois
+# à chaque worker via l'initializer, jamais par tâche.
+
+_WORKER = {}
+
+
+def _init_worker(initializer, initargs, render):
+    if initializer is not None:
+        initializer(*initargs)
+    _WORKER['render'] = render
+
+
+def _run_one(rom):
+    try:
+        return rom, _WORKER['render'](rom), None
+    except Exception as exc:
+        return rom, None, f'{type(exc).__name__}: {exc}'
+
+
+def resolve_jobs(jobs) -> int:
+    """0 ou négatif → un worker par cœur."""
+    if not jobs or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def map_roms(roms, render, initializer=None, initargs=(), jobs=1):
+    """
+    Applique render(rom) à chaque ROM (ou doc) et retourne
+    [(rom, résultat|None, erreur|None)] dans l'ordre de `roms`,
+    que le travail soit fait en série ou dans un pool.
+    """
+    roms = list(roms)
+    jobs = min(resolve_jobs(jobs), max(len(roms), 1))
+    if jobs == 1:
+        _init_worker(initializer, initargs, render)
+        return [_run_one(rom) for rom in roms]
+    # Import différé : inutile (et coûteux) pour les chemins série / à la demande
+    from multiprocessing import Pool
+    chunksize = max(1, len(roms) // (jobs * 8))
+    with Pool(jobs, _init_worker, (initializer, initargs, render)) as pool:
+        return pool.map(_run_one, roms, chunksize=chunksize)
+
+
+def report_failures(results, label):
+    """Affiche le résumé des ROMs en échec et retourne leur nombre."""
+    failures = [(rom, err) for rom, _, err in results if err]
+    if failures:
+        print(f'{len(failures)} ROM(s) {label} en échec :')
+        for rom, err in failures:
+            print(f'  - {rom}: {err}')
+    return len(failures)
+
+
+def add_jobs_argument(parser):
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='nombre de processus (0 = un par cœur, défaut 1)')
@@ -0,0 +1,222 @@
+import os
+import re
+import sys
+import mmap
+import struct
+import hashlib
+import argparse
+
+from buildManifest import CACHE_DIR
+from hashTable import HashTable, name_hash
+
+# ————————————————————————————————————————————
+# Index d'offsets dans les gros fichiers sources, pour un accès direct à un
+# seul enregistrement :
+#   - chaque section [rom] des INI LEDSpicer / LEDBlinky / goldo ;
+#   - chaque clé de premier niveau `rom:` de fbneo.yml.
+# L'index est un fichier binaire .cache/<fichier>.idx :
+#   en-tête (magic, type, taille et mtime de la source, nombre d'entrées)
+#   puis des entrées (hash du nom en minuscules, offset, longueur) triées.
+# Une recherche projette l'index en mémoire (mmap), fait une dichotomie sur
+# les hash puis ne lit que l'extrait demandé du fichier source. L'index se
+# reconstruit tout seul dès que la taille ou le mtime de la source change.
+
+INDEX_MAGIC = b'ESPIDX\x00\x01'
+_HEADER = struct.Struct('<8sB3xQqI')
+_ENTRY = struct.Struct('<QQQ')
+_KINDS = {'ini': 1, 'yaml': 2}
+
+_INI_HEADER = re.compile(rb'^[ \t]*\[([^\r\n]+)\]', re.M)
+_YAML_KEY = re.compile(rb'^([^\s#][^:\r\n]*):(?=[ \t\r\n]|$)', re.M)
+
+_LOADED = {}
+
+
+def _kind_of(path):
+    return 'yaml' if path.endswith(('.yml', '.yaml')) else 'ini'
+
+
+def _pattern(kind):
+    return _YAML_KEY if kind == 'yaml' else _INI_HEADER
+
+
+def _source_key(path) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _sidecar_path(path):
+    # Nom du fichier + hash du chemin complet : deux sources de même nom dans
+    # des dossiers différents ont chacune leur index
+    tag = hashlib.blake2b(_source_key(path).encode('utf-8'), digest_size=4).hexdigest()
+    return os.path.join(CACHE_DIR, f'{os.path.basename(path)}.{tag}.idx')
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _open_map(path):
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Fichier vide : rien à projeter
+            return None
+
+
+def _normalize(kind, raw: bytes) -> str:
+    name = raw.decode('utf-8').strip().lower()
+    return name.strip('\'"') if kind == 'yaml' else name
+
+
+def build_spans(path, kind=None) -> dict:
+    """Parcourt `path` une fois et retourne {nom: [(offset, longueur), ...]}."""
+    kind = kind or _kind_of(path)
+    mm = _open_map(path)
+    if mm is None:
+        return {}
+    with mm:
+        return spans_of(mm, kind)
+
+
+def spans_of(data, kind) -> dict:
+    """Comme build_spans, sur un contenu déjà en mémoire (octets ou mmap)."""
+    starts = [(m.start(), _normalize(kind, m.group(1))) for m in _pattern(kind).finditer(data)]
+    size = len(data)
+    spans = {}
+    for i, (start, name) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else size
+        spans.setdefault(name, []).append((start, end - start))
+    return spans
+
+
+def build_index_bytes(path, kind, stat_key) -> bytes:
+    entries = sorted((name_hash(name), off, length)
+                     for name, spans in build_spans(path, kind).items()
+                     for off, length in spans)
+    parts = [_HEADER.pack(INDEX_MAGIC, _KINDS[kind], stat_key[0], stat_key[1], len(entries))]
+    parts.extend(_ENTRY.pack(*e) for e in entries)
+    return b''.join(parts)
+
+
+class SourceIndex:
+    """Index binaire (mmap ou octets) d'un fichier source, valide pour (taille, mtime)."""
+
+    def __init__(self, path, kind, blob):
+        self.path = path
+        self.kind = kind
+        self._blob = blob
+        magic, kind_id, size, mtime_ns, count = _HEADER.unpack_from(blob, 0)
+        self._table = HashTable(blob, _HEADER.size, count, _ENTRY)
+        self.stat_key = (size, mtime_ns)
+        self._ok = magic == INDEX_MAGIC and kind_id == _KINDS[kind]
+
+    def close(self):
+        """Libère la projection du sidecar (indispensable sous Windows avant de le remplacer)."""
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+
+    def is_valid(self) -> bool:
+        try:
+            return self._ok and _stat_key(self.path) == self.stat_key
+        except OSError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def lookup(self, name) -> list:
+        """[(offset, longueur)] des occurrences de `name` (dichotomie sur les hash)."""
+        return [(off, length) for _, off, length in self._table.candidates(name)]
+
+    def read(self, name) -> str:
+        """Texte de l'enregistrement `name` (toutes occurrences), '' si absent."""
+        if not self.lookup(name):
+            return ''
+        pattern = _pattern(self.kind)
+        with _open_map(self.path) as mm:
+            def name_of(entry):
+                # Le nom est celui de l'en-tête de l'extrait, dans la source
+                m = pattern.match(mm, entry[1], entry[1] + entry[2])
+                return _normalize(self.kind, m.group(1)) if m else ''
+            return ''.join(mm[off:off + length].decode('utf-8')
+                           for _, off, length in self._table.matching(name, name_of))
+
+
+def _open_sidecar(path, kind):
+    try:
+        with open(_sidecar_path(path), 'rb') as f:
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(blob) < _HEADER.size:
+        blob.close()
+        return None
+    return SourceIndex(path, kind, blob)
+
+
+def _write_sidecar(path, data: bytes):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    side = _sidecar_path(path)
+    tmp = f'{side}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, side)
+
+
+def load_source_index(path, kind=None) -> SourceIndex:
+    """Index de `path`, projeté depuis le sidecar ou reconstruit s'il est périmé."""
+    kind = kind or _kind_of(path)
+    key = _source_key(path)
+    index = _LOADED.pop(key, None)
+    if index is not None:
+        if index.is_valid():
+            _LOADED[key] = index
+            return index
+        index.close()
+    index = _open_sidecar(path, kind)
+    if index is None or not index.is_valid():
+        if index is not None:
+            # Une projection ouverte empêcherait os.replace du sidecar sous Windows
+            index.close()
+        data = build_index_bytes(path, kind, _stat_key(path))
+        try:
+            _write_sidecar(path, data)
+            index = _open_sidecar(path, kind)
+        except OSError:
+            index = None
+        if index is None:
+            # Cache non inscriptible : index gardé en mémoire pour ce processus
+            index = SourceIndex(path, kind, data)
+    _LOADED[key] = index
+    return index
+
+
+def read_ini_section(path, name) -> str:
+    """Texte de la (des) section(s) [name] de `path`, '' si absente."""
+    if not os.path.isfile(path):
+        return ''
+    return load_source_index(path, 'ini').read(name)
+
+
+def read_yaml_entry(path, key) -> str:
+    """Texte YAML de la clé de premier niveau `key`, ou None si absente."""
+    if not os.path.isfile(path):
+        return None
+    return load_source_index(path, 'yaml').read(key) or None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Construit / interroge l\'index d\'offsets d\'un fichier source')
+    parser.add_argument('file')
+    parser.add_argument('name', nargs='?', help='section INI ou clé YAML à afficher')
+    args = parser.parse_args()
+    idx = load_source_index(args.file)
+    if args.name:
+        text = idx.read(args.name)
+        if not text:
+            sys.exit(f'{args.name} absent de {args.file}')
+        sys.stdout.write(text)
+    else:
+        print(f'{args.file}: {len(idx)} enregistrement(s) → {_sidecar_path(args.file)}')
@@ -0,0 +1,63 @@
+import sys
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+TESTS = Path(__file__).resolve().parent
+GOLDEN = TESTS / 'golden'
+FIXTURES = TESTS / 'fixtures'
+
+sys.path.insert(0, str(ROOT))
+
+# Entrées des générateurs copiées dans chaque dossier de travail (les sorties
+# mame/, fbneo/, retroarch/ et systems/ y sont régénérées, jamais reprises du dépôt)
+INPUT_GLOBS = ('*.py', '*.ini', 'fbneo.yml')
+INPUT_DIRS = ('libreto',)
+
+
+def copy_inputs(dest: Path) -> Path:
+    dest.mkdir(parents=True, exist_ok=True)
+    for pattern in INPUT_GLOBS:
+        for path in ROOT.glob(pattern):
+            shutil.copy2(path, dest / path.name)
+    for name in INPUT_DIRS:
+        shutil.copytree(ROOT / name, dest / name)
+    return dest
+
+
+def run(workdir: Path, script, *args) -> str:
+    """Lance un générateur dans `workdir` ; retourne sa sortie (échec = test en échec)."""
+    proc = subprocess.run([sys.executable, script, *args], cwd=workdir,
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, f'{script} {" ".join(args)}\n{proc.stdout}\n{proc.stderr}'
+    return proc.stdout
+
+
+def build_all(workdir: Path, *args):
+    run(workdir, 'genMame.py', *args)
+    run(workdir, 'genFbNeo.py', *args)
+    run(workdir, 'genRetroarch.py', *args)
+    run(workdir, 'genSystems.py')
+
+
+def read_tree(folder: Path) -> dict:
+    return {p.name: p.read_bytes() for p in sorted(folder.glob('*.xml'))}
+
+
+@pytest.fixture(scope='session')
+def serial_build(tmp_path_factory) -> Path:
+    """Dossier de travail après un passage complet en série (mame, fbneo, retroarch, systems)."""
+    workdir = copy_inputs(tmp_path_factory.mktemp('serial'))
+    build_all(workdir)
+    return workdir
+
+
+@pytest.fixture
+def built_copy(serial_build, tmp_path) -> Path:
+    """Copie modifiable de serial_build (sorties, manifests et caches compris)."""
+    workdir = tmp_path / 'work'
+    shutil.copytree(serial_build, workdir, symlinks=True)
+    return workdir
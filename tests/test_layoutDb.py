@@ -0,0 +1,31 @@
+"""Requêtes par bouton de la base des layouts, construite sur les sorties générées."""
+import pytest
+
+
+@pytest.fixture(scope='module')
+def db(serial_build, tmp_path_factory):
+    import layoutDb
+    path = str(tmp_path_factory.mktemp('db') / 'layouts.db')
+    for source in ('mame', 'fbneo', 'systems'):
+        layoutDb.update_db(source, str(serial_build / source), path)
+    with layoutDb.LayoutDb(path) as conn:
+        yield conn
+
+
+def test_start_coin_are_not_slots(db):
+    # Un panel 2 boutons n'a pas de case 3 : START (physique 3) ne doit pas répondre
+    assert db.games_with_button('White', 3, panel=2) == []
+    assert db.conn.execute("SELECT COUNT(*) FROM buttons WHERE button_id IN ('START', 'COIN') "
+                           "AND slot IS NOT NULL").fetchone()[0] == 0
+
+
+def test_slot_matches_panel_position(db):
+    # Le 2-Button de genMame garde le physique d'origine : sf2 a ses boutons 4 et 3 en cases 1 et 2
+    rows = db.conn.execute(
+        "SELECT buttons.button_id, buttons.physical, buttons.slot FROM buttons "
+        "JOIN layouts ON layouts.id = buttons.layout_id JOIN games ON games.id = layouts.game_id "
+        "WHERE games.source = 'mame' AND games.rom = 'sf2' AND layouts.panel_type = '2-Button' "
+        "AND buttons.slot IS NOT NULL ORDER BY buttons.slot").fetchall()
+    assert [(r['button_id'], r['physical'], r['slot']) for r in rows] == [('1', 4, 1), ('2', 3, 2)]
+    color = db.game_layout('sf2', 2, 'mame')['buttons'][0]['color']
+    assert ('mame', 'sf2') in db.games_with_button(color, 1, panel=2, source='mame')
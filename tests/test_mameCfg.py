@@ -0,0 +1,86 @@
+"""Injection de la configuration MAME sur un dump de ports de référence (tests/fixtures)."""
+import os
+import shutil
+
+import pytest
+
+from conftest import FIXTURES, GOLDEN, ROOT
+
+DUMP = FIXTURES / 'sf2_inputs.cfg'
+
+
+@pytest.fixture
+def cfg_dir(tmp_path, monkeypatch):
+    # Tables compilées dans le .cache du dossier de travail, pas dans celui du dépôt
+    for name in ('ledspicer-arcade-colors.ini', 'ledblinky-arcade-colors.ini',
+                 'goldo-systems-colors.ini', 'ledblinky-arcade-controls.ini'):
+        shutil.copy2(ROOT / name, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / 'cfg'
+    folder.mkdir()
+    shutil.copy2(DUMP, folder / 'sf2_inputs.cfg')
+    return folder
+
+
+def test_merge_matches_golden(cfg_dir):
+    import mameCfg
+    path = mameCfg.inject('sf2', 6, cfg_dir=str(cfg_dir))
+    assert open(path, 'rb').read() == (GOLDEN / 'mamecfg' / 'sf2-6-Button.cfg').read_bytes()
+
+
+def test_merge_keeps_unmapped_ports():
+    import mameCfg
+    text = DUMP.read_text(encoding='utf-8')
+    assert mameCfg.merge_ports(text, {}) == text
+    merged = mameCfg.merge_ports(text, {'P1_BUTTON4': 'KEYCODE_1PAD'})
+    # La séquence non standard est conservée, la standard ajoutée après
+    assert '<newseq type="increment">' in merged
+    assert merged.count('KEYCODE_1PAD') == 1
+    assert mameCfg.merge_ports(merged, {'P1_BUTTON4': 'KEYCODE_1PAD'}) == merged
+
+
+def test_backup_and_restore_original(cfg_dir):
+    import mameCfg
+    original = cfg_dir / 'sf2.cfg'
+    original.write_bytes(b'original')
+    mameCfg.inject('sf2', 8, cfg_dir=str(cfg_dir))
+    mameCfg.inject('sf2', 6, cfg_dir=str(cfg_dir))
+    assert original.read_bytes() != b'original'
+    # La sauvegarde garde le vrai original, même après deux injections
+    assert (cfg_dir / 'sf2_backup.cfg').read_bytes() == b'original'
+    assert mameCfg.restore('sf2', str(cfg_dir))
+    assert original.read_bytes() == b'original'
+    assert not (cfg_dir / 'sf2_backup.cfg').exists()
+    assert not mameCfg.restore('sf2', str(cfg_dir))
+
+
+def test_restore_without_original(cfg_dir):
+    import mameCfg
+    mameCfg.inject('sf2', 6, cfg_dir=str(cfg_dir))
+    assert (cfg_dir / 'sf2.cfg').exists()
+    assert mameCfg.restore('sf2', str(cfg_dir))
+    assert sorted(p.name for p in cfg_dir.iterdir()) == ['sf2_inputs.cfg']
+
+
+def test_unknown_rom(cfg_dir):
+    import mameCfg
+    shutil.copy2(DUMP, cfg_dir / 'zzznotarom_inputs.cfg')
+    assert mameCfg.inject('zzznotarom', 6, cfg_dir=str(cfg_dir)) is None
+    assert not (cfg_dir / 'zzznotarom.cfg').exists()
+
+
+def test_prebuilt_stale_after_ini_edit(cfg_dir, tmp_path):
+    import mameCfg
+    mameCfg.load_tables('sf2')
+    prebuilt = tmp_path / 'prebuilt'
+    path = prebuilt / '6-Button' / 'sf2.cfg'
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b'prebuilt')
+    served = mameCfg.inject('sf2', 6, cfg_dir=str(cfg_dir), prebuilt=str(prebuilt))
+    assert open(served, 'rb').read() == b'prebuilt'
+    # Un INI source plus récent que le .cfg précompilé : retour à la fusion
+    ini = tmp_path / 'ledblinky-arcade-controls.ini'
+    newer = path.stat().st_mtime_ns + 10**9
+    os.utime(ini, ns=(newer, newer))
+    path = mameCfg.inject('sf2', 6, cfg_dir=str(cfg_dir), prebuilt=str(prebuilt))
+    assert open(path, 'rb').read() == (GOLDEN / 'mamecfg' / 'sf2-6-Button.cfg').read_bytes()
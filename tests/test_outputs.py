@@ -0,0 +1,90 @@
+"""
+Non-régression des sorties : XML de référence (tests/golden), identité du
+mode --jobs avec le mode série, identité launchGen / batch, et passages
+incrémentaux (manifest, OutputWriter).
+"""
+import os
+
+import pytest
+
+from conftest import GOLDEN, build_all, copy_inputs, read_tree, run
+
+GOLDEN_FILES = sorted(str(p.relative_to(GOLDEN)) for p in GOLDEN.glob('*/*.xml'))
+
+
+@pytest.mark.parametrize('name', GOLDEN_FILES)
+def test_golden(serial_build, name):
+    assert (serial_build / name).read_bytes() == (GOLDEN / name).read_bytes()
+
+
+def test_jobs_matches_serial(serial_build, tmp_path):
+    workdir = copy_inputs(tmp_path / 'jobs')
+    build_all(workdir, '--jobs', '2')
+    for folder in ('mame', 'fbneo', 'retroarch', 'systems'):
+        parallel, serial = read_tree(workdir / folder), read_tree(serial_build / folder)
+        assert parallel.keys() == serial.keys(), folder
+        assert [n for n in serial if parallel[n] != serial[n]] == [], folder
+
+
+def test_launchgen_matches_batch(serial_build, monkeypatch):
+    monkeypatch.chdir(serial_build)
+    import launchGen
+    for source in ('mame', 'fbneo'):
+        batch = read_tree(serial_build / source)
+        diff = [n for n, data in batch.items() if launchGen.generate(source, n[:-4]) != data]
+        assert diff == [], source
+    systems = read_tree(serial_build / 'systems')
+    assert [n for n, data in systems.items() if launchGen.generate(n[:-4]) != data] == []
+    assert launchGen.generate('mame', 'not-a-rom') is None
+
+
+def _mtimes(folder):
+    return {p.name: p.stat().st_mtime_ns for p in folder.glob('*.xml')}
+
+
+def test_manifest_skips_unchanged(built_copy):
+    before = {folder: _mtimes(built_copy / folder) for folder in ('mame', 'fbneo', 'systems')}
+    assert '0 régénéré(s)' in run(built_copy, 'genMame.py')
+    assert '0 régénéré(s)' in run(built_copy, 'genFbNeo.py')
+    assert '0 régénéré(s)' in run(built_copy, 'genSystems.py')
+    assert {folder: _mtimes(built_copy / folder) for folder in before} == before
+
+
+def test_manifest_regenerates_and_prunes(built_copy):
+    ini = built_copy / 'goldo-systems-colors.ini'
+    text = ini.read_text(encoding='utf-8')
+    start = text.index('[snes]')
+    end = text.index('\n[', start + 1) + 1
+    # snes disparaît, megadrive change de couleur de joystick
+    text = text[:start] + text[end:]
+    start = text.index('[megadrive]')
+    end = text.index('\n[', start + 1)
+    section = text[start:end]
+    changed = '\n'.join('P1_JOYSTICK=Cyan' if line.startswith('P1_JOYSTICK') else line
+                        for line in section.split('\n'))
+    assert changed != section
+    ini.write_text(text[:start] + changed + text[end:], encoding='utf-8')
+    before = _mtimes(built_copy / 'systems')
+
+    out = run(built_copy, 'genSystems.py')
+    assert '1 supprimé(s)' in out
+    assert not (built_copy / 'systems' / 'snes.xml').exists()
+    assert b'<joystick color="Cyan"/>' in (built_copy / 'systems' / 'megadrive.xml').read_bytes()
+    after = _mtimes(built_copy / 'systems')
+    touched = sorted(n for n in after if after[n] != before[n])
+    assert touched == ['megadrive.xml']
+
+
+def test_output_writer_skips_unchanged(tmp_path):
+    from outputWriter import OutputWriter
+    path = tmp_path / 'out.xml'
+    writer = OutputWriter()
+    assert writer.write(str(path), b'<a/>\n')
+    os.utime(path, ns=(1, 1))
+    assert not writer.write(str(path), b'<a/>\n')
+    assert path.stat().st_mtime_ns == 1
+    assert writer.write(str(path), b'<b/>\n')
+    assert path.read_bytes() == b'<b/>\n'
+    assert writer.remove(str(path)) and not writer.remove(str(path))
+    assert (writer.written, writer.skipped, writer.removed) == (2, 1, 1)
+    assert os.listdir(tmp_path) == []
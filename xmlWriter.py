@@ -0,0 +1,109 @@
+import xml.etree.ElementTree as ET
+
+# ————————————————————————————————————————————
+# Écriture XML indentée directement depuis l'ElementTree.
+# Produit exactement les mêmes octets que l'ancien aller-retour
+#   minidom.parseString(ET.tostring(elem)).toprettyxml(indent=...)
+# sans sérialiser, re-parser puis reconstruire un DOM complet par fichier.
+
+
+def _escape(data: str) -> str:
+    # Même échappement que minidom._write_data
+    if '&' in data:
+        data = data.replace('&', '&amp;')
+    if '<' in data:
+        data = data.replace('<', '&lt;')
+    if '"' in data:
+        data = data.replace('"', '&quot;')
+    if '>' in data:
+        data = data.replace('>', '&gt;')
+    return data
+
+
+def _text(data: str) -> str:
+    # Le parseur XML normalise les fins de ligne du texte (CR LF / CR → LF)
+    if '\r' in data:
+        data = data.replace('\r\n', '\n').replace('\r', '\n')
+    return data
+
+
+def _children(elem: ET.Element):
+    """Nœuds enfants tels que minidom les verrait : texte, éléments, tails."""
+    nodes = []
+    if elem.text and len(elem):
+        nodes.append(_text(elem.text))
+    elif elem.text:
+        return [_text(elem.text)]
+    for child in elem:
+        nodes.append(child)
+        if child.tail:
+            if nodes and isinstance(nodes[-1], str):
+                nodes[-1] += _text(child.tail)
+            else:
+                nodes.append(_text(child.tail))
+    return nodes
+
+
+def iter_pretty(elem: ET.Element, indent='  ', encoding='utf-8', newl='\n', fragments=None):
+    """
+    Génère le document indenté morceau par morceau (str).
+    `fragments` : {élément: texte déjà indenté (pretty_fragment)} pour les
+    sous-arbres partagés entre plusieurs documents, recopiés tels quels.
+    """
+    if encoding is None:
+        yield '<?xml version="1.0" ?>' + newl
+    else:
+        yield f'<?xml version="1.0" encoding="{encoding}"?>{newl}'
+    yield from _iter_nodes(elem, '', indent, newl, fragments)
+
+
+def _iter_nodes(elem, pad, indent, newl, fragments=None):
+    stack = [(elem, pad)]
+    while stack:
+        node, pad = stack.pop()
+        if isinstance(node, tuple):
+            # Balise fermante différée : (None, pad, tag)
+            yield f'{pad}</{node[1]}>{newl}'
+            continue
+        if isinstance(node, str):
+            yield _escape(f'{pad}{node}{newl}')
+            continue
+        if fragments and node in fragments:
+            yield fragments[node]
+            continue
+        parts = [pad, '<', node.tag]
+        for name, value in node.attrib.items():
+            parts.append(f' {name}="{_escape(value)}"')
+        children = _children(node)
+        if not children:
+            parts.append('/>' + newl)
+            yield ''.join(parts)
+        elif len(children) == 1 and isinstance(children[0], str):
+            parts.append(f'>{_escape(children[0])}</{node.tag}>{newl}')
+            yield ''.join(parts)
+        else:
+            parts.append('>' + newl)
+            yield ''.join(parts)
+            stack.append(((None, node.tag), pad))
+            inner = pad + indent
+            for child in reversed(children):
+                stack.append((child, inner))
+
+
+def pretty_fragment(elem: ET.Element, depth=0, indent='  ', newl='\n') -> str:
+    """Sous-arbre `elem` tel qu'il apparaît à la profondeur `depth` d'un document."""
+    return ''.join(_iter_nodes(elem, indent * depth, indent, newl))
+
+
+def pretty_xml(elem: ET.Element, indent='  ', encoding='utf-8', newl='\n', fragments=None):
+    """Document complet : bytes si `encoding`, sinon str (comme toprettyxml)."""
+    text = ''.join(iter_pretty(elem, indent, encoding, newl, fragments))
+    if encoding is None:
+        return text
+    return text.encode(encoding, 'xmlcharrefreplace')
+
+
+def write_pretty(elem: ET.Element, fh, indent='  ', encoding='utf-8', newl='\n'):
+    """Écrit le document indenté dans un fichier binaire ouvert."""
+    for chunk in iter_pretty(elem, indent, encoding, newl):
+        fh.write(chunk.encode(encoding or 'utf-8', 'xmlcharrefreplace'))